@@ -1,27 +1,74 @@
-import os
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager
-
-
-app = Flask(__name__)
-app.config['SECRET_KEY'] =  b'WR#&f&+%78er0we=%799eww+#7^90-;s'
-login = LoginManager(app)
-login.login_view = 'login'
-
-basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'data', 'data.sqlite')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
-
-app.config['UPLOAD_FOLDER'] = os.path.join(basedir, 'data', 'uploads')
-app.config['DATA_FOLDER'] = os.path.join(basedir, 'data')
-app.config['MAX_CONTENT_LENGTH'] = 1 * 1024 * 1024
-# app.config['MAX_CONTENT_LENGTH'] = 8
-
-from app import views
-from app.models import *
-
-@app.shell_context_processor
-def make_shell_context():
-    return dict(db=db, User=User, LoginManager=LoginManager)
+import os
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import LoginManager
+
+
+app = Flask(__name__)
+app.config['SECRET_KEY'] =  b'WR#&f&+%78er0we=%799eww+#7^90-;s'
+login = LoginManager(app)
+login.login_view = 'login'
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+#The database can be pointed at another file, such as a copy used by the tests.
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///' + os.path.join(basedir, 'data', 'data.sqlite'))
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+db = SQLAlchemy(app)
+
+app.config['UPLOAD_FOLDER'] = os.path.join(basedir, 'data', 'uploads')
+app.config['DATA_FOLDER'] = os.path.join(basedir, 'data')
+app.config['MAX_CONTENT_LENGTH'] = 1 * 1024 * 1024
+# app.config['MAX_CONTENT_LENGTH'] = 8
+
+#Approximate nearest neighbour mode for the tag similarity used by the recommender, see app/ann.py. More tables or
+#probes raise recall, more bits lower latency.
+app.config['RECOMMENDER_ANN'] = False
+app.config['RECOMMENDER_ANN_TABLES'] = 16
+app.config['RECOMMENDER_ANN_BITS'] = 10
+app.config['RECOMMENDER_ANN_PROBES'] = 4
+
+#The number of '/visualise' graphs to cache, and the number of seconds each one is kept for.
+app.config['GRAPH_CACHE_SIZE'] = 256
+app.config['GRAPH_CACHE_TTL'] = 600
+
+#The number of processes the catalogue is sharded across when scoring recommendations in exact mode, see
+#app/sharded_scoring.py. 0 scores in the process handling the request.
+app.config['RECOMMENDER_WORKERS'] = 0
+
+#The credentials and URLs used by the IGDB client, see app/igdb.py. The URLs can be pointed at a local server.
+app.config['IGDB_CLIENT_ID'] = os.environ.get('IGDB_CLIENT_ID', 'hgy1ax1mx3556gkjexrau57t46h5ux')
+app.config['IGDB_CLIENT_SECRET'] = os.environ.get('IGDB_CLIENT_SECRET', 'yq1zb8thokdpvmj7udjezucvrmm5kz')
+app.config['IGDB_API_URL'] = os.environ.get('IGDB_API_URL', 'https://api.igdb.com/v4')
+app.config['IGDB_TOKEN_URL'] = os.environ.get('IGDB_TOKEN_URL', 'https://id.twitch.tv/oauth2/token')
+
+#The number of profanity verdicts to cache for strings which are not tags, see app/profanity.py.
+app.config['PROFANITY_CACHE_SIZE'] = 10000
+
+#The number of item metadata records to cache.
+app.config['ITEM_CACHE_SIZE'] = 100000
+
+from app import views
+from app.models import *
+
+
+def init_db():
+    """
+    Creates any tables that are missing from the database, such as the caches used by the recommender, and the full-text
+    search index. This is run by the init-db command, the build and import scripts and gunicorn before it forks the
+    workers, rather than whenever the app is imported, so importing the app never writes to the database.
+    """
+    from app.search_index import ensure_search_index
+    db.create_all()
+    ensure_search_index()
+
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create any missing tables and the full-text search index."""
+    init_db()
+    print("Initialised the database")
+
+
+@app.shell_context_processor
+def make_shell_context():
+    return dict(db=db, User=User, LoginManager=LoginManager)
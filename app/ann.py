@@ -0,0 +1,94 @@
+import numpy
+
+
+class TagLSH:
+    """
+    An approximate nearest neighbour index over the tag vectors of the recommender index, using random-projection
+    locality sensitive hashing. Each table hashes a tag vector to the signs of its projections onto n_bits random
+    hyperplanes, so two items land in the same bucket with a probability that rises with the cosine similarity of their
+    tags. The sign of a projection does not depend on the length of the vector, so hashing the raw counts gives the same
+    buckets as hashing the L2-normalised rows.
+
+    Recall is raised by adding tables or probing more buckets per table, and latency is reduced by adding bits, which
+    makes each bucket smaller.
+    """
+
+    def __init__(self, index, n_tables=16, n_bits=10, probes=4, seed=0, chunk_size=4096):
+        """
+        Hashes every stored row of the recommender index.
+        :param index: The RecommenderIndex.
+        :param n_tables: The number of hash tables.
+        :param n_bits: The number of hyperplanes, and so bits in each bucket code, per table.
+        :param probes: The number of neighbouring buckets to search in each table, in addition to the query's own bucket.
+        :param seed: The seed for the random hyperplanes.
+        :param chunk_size: The number of rows projected at once, which bounds the memory used while hashing.
+        """
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.probes = probes
+        self.planes = numpy.random.default_rng(seed).standard_normal((index.stored_columns, n_tables * n_bits))
+
+        codes = numpy.full((index.stored_rows, n_tables), -1, dtype=numpy.int64)
+        for start in range(0, index.stored_rows, chunk_size):
+            end = min(start + chunk_size, index.stored_rows)
+            projections = self.project_rows(index, start, end)
+
+            #Rows without tags are left with a code of -1 so they never match a query.
+            tagged = index.indptr[start + 1:end + 1] > index.indptr[start:end]
+            codes[start:end][tagged] = self.codes(projections[tagged])
+
+        #Sort each table by code so the rows in a bucket can be found with a binary search.
+        self.order = numpy.argsort(codes, axis=0, kind='stable')
+        self.sorted_codes = numpy.take_along_axis(codes, self.order, axis=0)
+
+    def project_rows(self, index, start, end):
+        """
+        Projects a range of the stored rows of the recommender index onto the random hyperplanes.
+        :param index: The RecommenderIndex.
+        :param start: The first row.
+        :param end: The row after the last row.
+        :return: A numpy array of shape (end - start, n_tables * n_bits).
+        """
+        first, last = index.indptr[start], index.indptr[end]
+        contributions = index.counts[first:last, None] * self.planes[index.indices[first:last]]
+
+        #Sum the contributions of each row. numpy.add.reduceat cannot sum empty rows, so they are left as zeros.
+        projections = numpy.zeros((end - start, self.planes.shape[1]))
+        row_starts = index.indptr[start:end] - first
+        nonempty = index.indptr[start + 1:end + 1] > index.indptr[start:end]
+        if numpy.any(nonempty):
+            projections[nonempty] = numpy.add.reduceat(contributions, row_starts[nonempty], axis=0)
+        return projections
+
+    def codes(self, projections):
+        """
+        Converts projections into one bucket code per table.
+        :param projections: A numpy array of shape (rows, n_tables * n_bits).
+        :return: A numpy array of shape (rows, n_tables).
+        """
+        bits = (projections > 0).reshape(len(projections), self.n_tables, self.n_bits)
+        return (bits * (1 << numpy.arange(self.n_bits, dtype=numpy.int64))).sum(axis=2)
+
+    def query(self, tags):
+        """
+        Finds the stored rows which hash to the same bucket as a tag vector in any table, or to one of the neighbouring
+        buckets reached by flipping the bits whose projections were closest to zero.
+        :param tags: A dictionary with the column as the key and the tag count as the value, as returned by row_tags.
+        :return: A numpy array of rows, in ascending order.
+        """
+        projection = numpy.zeros(self.planes.shape[1])
+        for column, count in tags.items():
+            if column < len(self.planes):
+                projection += count * self.planes[column]
+        code = self.codes(projection[None, :])[0]
+
+        found = []
+        margins = numpy.abs(projection).reshape(self.n_tables, self.n_bits)
+        for table in range(self.n_tables):
+            probe_codes = [code[table]] + [code[table] ^ (1 << int(bit))
+                                           for bit in numpy.argsort(margins[table])[:self.probes]]
+            for probe_code in probe_codes:
+                first = numpy.searchsorted(self.sorted_codes[:, table], probe_code, side='left')
+                last = numpy.searchsorted(self.sorted_codes[:, table], probe_code, side='right')
+                found.append(self.order[first:last, table])
+        return numpy.unique(numpy.concatenate(found + [numpy.zeros(0, dtype=numpy.int64)]))
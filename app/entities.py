@@ -0,0 +1,183 @@
+from app.models import *
+import hashlib
+import json
+import threading
+
+#The spacy model is loaded the first time a title is processed, so routes which never extract entities do not pay for it.
+#Only named entity recognition is used, so the components it does not need are not loaded.
+NLP_MODEL = 'en_core_web_sm'
+NLP_EXCLUDE = ['tagger', 'parser', 'lemmatizer']
+_nlp_entity = None
+_nlp_lock = threading.Lock()
+
+#Entities already loaded by this process, keyed by (id, type). Each value is a (title hash, entities) tuple.
+_entities_cache = {}
+
+
+def get_nlp_entity():
+    """
+    Gets the spacy model used to extract entities, loading it the first time it is needed. A server which forks its
+    workers can call this before forking so every worker shares the loaded model.
+    :return: The spacy Language object.
+    """
+    global _nlp_entity
+    if _nlp_entity is None:
+        with _nlp_lock:
+            if _nlp_entity is None:
+                #spacy itself is slow to import, so it is imported here rather than when the app starts.
+                import spacy
+                _nlp_entity = spacy.load(NLP_MODEL, exclude=NLP_EXCLUDE)
+    return _nlp_entity
+
+
+def extract_entities(title):
+    """
+    This function uses the spacy model to extract entities from the title of an item.
+    :param title: The title of an item
+    :return entities: A dictionary of entities containing the text as a key and the entity as a value.
+    """
+    #Get entities from title.
+    return doc_entities(get_nlp_entity()(title))
+
+
+def doc_entities(doc):
+    """
+    Converts the entities found by the spacy model in a title into the dictionary returned by extract_entities.
+    :param doc: The spacy Doc of the title.
+    :return entities: A dictionary of entities containing the text as a key and the entity as a value.
+    """
+    entities = {}
+
+    #Store these entities as a dictionary, with the key as the text and the value as the entity label given by spacy.
+    for string in doc.ents:
+        entities[string.text] = string.label_
+    return entities
+
+
+def pipe_entities(titles, batch_size=1000, n_process=1):
+    """
+    Extracts the entities of many titles by streaming them through the spacy model in batches, which is much faster than
+    calling extract_entities on each title. The entities are the same as extract_entities returns.
+    :param titles: An iterable of titles.
+    :param batch_size: The number of titles the model processes at once.
+    :param n_process: The number of processes running the model. Each process loads its own copy of the model.
+    :return: A generator of entity dictionaries, in the same order as titles.
+    """
+    for doc in get_nlp_entity().pipe(titles, batch_size=batch_size, n_process=n_process):
+        yield doc_entities(doc)
+
+
+def nlp_model_version():
+    """
+    Gets the name and version of the spacy model, so stored entities can be rebuilt when the model is upgraded.
+    :return: The name and version, for example "en_core_web_sm 3.7.1".
+    """
+    meta = get_nlp_entity().meta
+    return f"{meta.get('lang')}_{meta.get('name')} {meta.get('version')}"
+
+
+def write_entities(rows):
+    """
+    Adds or replaces the stored entities of many items with a single statement. The caller is responsible for committing.
+    :param rows: A list of (id, type, title, entities) tuples, with entities as returned by extract_entities.
+    """
+    if not rows:
+        return
+    db.session.execute(TitleEntities.__table__.insert().prefix_with("OR REPLACE"),
+                       [{"item_id": int(item_id), "item_type": item_type, "title_hash": title_hash(title),
+                         "entities": json.dumps(entities)} for item_id, item_type, title, entities in rows])
+
+
+def title_hash(title):
+    """
+    Hashes a title so that stored entities can be checked against the current title of an item.
+    :param title: The title of an item.
+    :return: The SHA-1 hex digest of the title.
+    """
+    return hashlib.sha1(title.encode('utf-8')).hexdigest()
+
+
+def get_entities(item_id, item_type, title):
+    """
+    Gets the entities for a single item from the TitleEntities table, only running the spacy model if the item has no
+    stored entities or its title has changed since they were stored.
+    :param item_id: The ID of the item.
+    :param item_type: The type of the item.
+    :param title: The current title of the item.
+    :return: A dictionary of entities in the same format as extract_entities.
+    """
+    return get_catalogue_entities([(int(item_id), item_type)], [title])[0]
+
+
+def get_catalogue_entities(keys, titles):
+    """
+    Gets the entities for a list of items. Entities already loaded by this process are reused, the rest are read from
+    the TitleEntities table with at most one query per item type, and the spacy model is only run on titles with no matching stored entry.
+    The titles without stored entities are run through the model together, and stored in a single commit.
+    :param keys: A list of (id, type) tuples.
+    :param titles: A list of the current titles of the items, in the same order as keys.
+    :return: A list of entity dictionaries, in the same order as keys.
+    """
+    hashes = [title_hash(title) for title in titles]
+    missing = {key for key, hashed in zip(keys, hashes) if _entities_cache.get(key, (None,))[0] != hashed}
+
+    #Load any stored entities this process has not seen yet, with one query per item type.
+    if missing:
+        if len(missing) > 500:
+            stored = TitleEntities.query.all()
+        else:
+            stored = []
+            for item_type in {item_type for item_id, item_type in missing}:
+                ids = [item_id for item_id, missing_type in missing if missing_type == item_type]
+                stored += TitleEntities.query.filter(TitleEntities.item_type == item_type,
+                                                     TitleEntities.item_id.in_(ids)).all()
+        for row in stored:
+            _entities_cache[row.item_id, row.item_type] = (row.title_hash, json.loads(row.entities))
+
+    #Run the spacy model on any titles which are still missing or have been renamed in one batch, and store the results
+    #with a single statement.
+    stale = {key: (title, hashed) for key, title, hashed in zip(keys, titles, hashes)
+             if _entities_cache.get(key, (None,))[0] != hashed}
+    if stale:
+        extracted = pipe_entities([title for title, hashed in stale.values()])
+        for (key, (title, hashed)), entities in zip(stale.items(), extracted):
+            _entities_cache[key] = (hashed, entities)
+        write_entities([(item_id, item_type, title, _entities_cache[item_id, item_type][1])
+                        for (item_id, item_type), (title, hashed) in stale.items()])
+        try:
+            db.session.commit()
+        except:
+            db.session.rollback()
+    return [_entities_cache[key][1] for key in keys]
+
+
+def store_entities(item_id, item_type, title, hashed=None):
+    """
+    Extracts the entities of a title and adds them to the TitleEntities table. The caller is responsible for committing.
+    :param item_id: The ID of the item.
+    :param item_type: The type of the item.
+    :param title: The title of the item.
+    :param hashed: The hash of the title, if it has already been calculated.
+    :return: The extracted entities.
+    """
+    hashed = hashed or title_hash(title)
+    entities = extract_entities(title)
+    db.session.merge(TitleEntities(item_id=int(item_id), item_type=item_type, title_hash=hashed,
+                                   entities=json.dumps(entities)))
+    _entities_cache[int(item_id), item_type] = (hashed, entities)
+    return entities
+
+
+def refresh_entities(item_id, item_type, title):
+    """
+    Refreshes the stored entities for an item. This is called by the add_*_to_database functions when a title is
+    inserted so that the entities are ready before the item is first recommended.
+    :param item_id: The ID of the item.
+    :param item_type: The type of the item.
+    :param title: The title of the item.
+    """
+    store_entities(item_id, item_type, title)
+    try:
+        db.session.commit()
+    except:
+        db.session.rollback()
@@ -0,0 +1,219 @@
+from app import app
+from app.search_index import ITEM_TYPES
+import json
+import os
+import shutil
+import time
+import numpy
+
+#The feature store holds one directory per version, and the CURRENT file names the version in use.
+FEATURES_FOLDER = os.path.join(app.config['DATA_FOLDER'], 'features')
+CURRENT = os.path.join(FEATURES_FOLDER, 'CURRENT')
+FORMAT = 1
+
+#The arrays of the recommender index saved by the feature store. Each is saved as a .npy file and opened with a memory
+#map, so every process reading a version shares one copy of it in the page cache.
+ARRAYS = ['item_ids', 'item_types', 'title_offsets', 'title_bytes', 'indptr', 'indices', 'counts', 'norms', 'tag_ids',
+          'postings_ptr', 'postings_rows', 'postings_counts', 'rows_by_length', 'sorted_lengths', 'entity_ptr',
+          'entity_text_ids', 'entity_label_ids', 'entity_text_offsets', 'entity_text_bytes', 'entity_postings_ptr',
+          'entity_postings_rows']
+
+
+class StoredStrings:
+    """
+    A read-only sequence of strings held as UTF-8 bytes, with the bytes of string i stored in
+    data[offsets[i]:offsets[i + 1]]. Strings are decoded when they are read.
+    """
+
+    def __init__(self, offsets, data):
+        """
+        :param offsets: The array of offsets, one longer than the number of strings.
+        :param data: The array of bytes.
+        """
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        return self.data[self.offsets[position]:self.offsets[position + 1]].tobytes().decode('utf-8')
+
+
+class StoredEntities:
+    """
+    A read-only sequence of the entity dictionaries of every row. The entities of row i are the texts and labels at
+    positions ptr[i]:ptr[i + 1] of text_ids and label_ids, and are converted back into a dictionary when they are read.
+    """
+
+    def __init__(self, ptr, text_ids, label_ids, texts, labels):
+        """
+        :param ptr: The row pointer array.
+        :param text_ids: The position of the text of each entity in texts.
+        :param label_ids: The position of the label of each entity in labels.
+        :param texts: The sorted sequence of every entity text.
+        :param labels: The list of every entity label.
+        """
+        self.ptr = ptr
+        self.text_ids = text_ids
+        self.label_ids = label_ids
+        self.texts = texts
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.ptr) - 1
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        start, end = self.ptr[position], self.ptr[position + 1]
+        return {self.texts[text]: self.labels[label]
+                for text, label in zip(self.text_ids[start:end].tolist(), self.label_ids[start:end].tolist())}
+
+
+class ChangedSequence:
+    """
+    A list-like view of a read-only stored sequence. Values which are set or appended are held in memory in place of the
+    stored values, so the stored sequence is never modified.
+    """
+
+    def __init__(self, stored):
+        """
+        :param stored: The stored sequence.
+        """
+        self.stored = stored
+        self.changed = {}
+        self.added = []
+
+    def __len__(self):
+        return len(self.stored) + len(self.added)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if position in self.changed:
+            return self.changed[position]
+        if position >= len(self.stored):
+            return self.added[position - len(self.stored)]
+        return self.stored[position]
+
+    def __setitem__(self, position, value):
+        if position >= len(self.stored):
+            self.added[position - len(self.stored)] = value
+        else:
+            self.changed[position] = value
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def append(self, value):
+        self.added.append(value)
+
+
+def encode_strings(strings):
+    """
+    Encodes a list of strings into the offsets and bytes read by StoredStrings.
+    :param strings: The list of strings.
+    :return: A tuple of the offsets array and the bytes array.
+    """
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+    numpy.cumsum([len(string) for string in encoded], out=offsets[1:])
+    return offsets, numpy.frombuffer(b''.join(encoded), dtype=numpy.uint8)
+
+
+def current_feature_store():
+    """
+    Gets the directory of the version of the feature store in use.
+    :return: The path of the directory, or None if no feature store has been saved.
+    """
+    try:
+        with open(CURRENT) as file:
+            version = file.read().strip()
+    except OSError:
+        return None
+    return os.path.join(FEATURES_FOLDER, version) if version else None
+
+
+def save_feature_store(index):
+    """
+    Saves the arrays of a recommender index as a new version of the feature store, and then makes it the current
+    version. The version is written to a temporary directory which is renamed once complete, and the CURRENT file is
+    replaced in one step, so readers always see a complete version. Every version other than the new one and the one it
+    replaces is deleted. Processes still reading a deleted version keep their memory maps of it.
+    :param index: A RecommenderIndex built from the database, with no changes applied since.
+    :return: The path of the new version.
+    """
+    entities = index.catalogue_entities()
+    texts, ptr, posting_rows = index.build_entity_postings()
+    text_ids = {text: position for position, text in enumerate(texts)}
+    labels = sorted({label for row_entities in entities for label in row_entities.values()})
+    label_ids = {label: position for position, label in enumerate(labels)}
+
+    title_offsets, title_bytes = encode_strings(index.titles)
+    entity_text_offsets, entity_text_bytes = encode_strings(texts)
+    tag_ids = numpy.zeros(len(index.tag_columns), dtype=numpy.int64)
+    for tag_id, column in index.tag_columns.items():
+        tag_ids[column] = tag_id
+    arrays = {
+        'item_ids': numpy.array([key[0] for key in index.keys], dtype=numpy.int64),
+        'item_types': numpy.array([ITEM_TYPES.index(key[1]) for key in index.keys], dtype=numpy.int8),
+        'title_offsets': title_offsets, 'title_bytes': title_bytes,
+        'indptr': index.indptr, 'indices': index.indices, 'counts': index.counts, 'norms': index.norms,
+        'tag_ids': tag_ids,
+        'postings_ptr': index.postings_ptr, 'postings_rows': index.postings_rows,
+        'postings_counts': index.postings_counts,
+        'rows_by_length': index.rows_by_length, 'sorted_lengths': index.sorted_lengths,
+        'entity_ptr': numpy.cumsum([0] + [len(row_entities) for row_entities in entities], dtype=numpy.int64),
+        'entity_text_ids': numpy.array([text_ids[text] for row_entities in entities for text in row_entities],
+                                       dtype=numpy.int64),
+        'entity_label_ids': numpy.array([label_ids[label] for row_entities in entities
+                                         for label in row_entities.values()], dtype=numpy.int32),
+        'entity_text_offsets': entity_text_offsets, 'entity_text_bytes': entity_text_bytes,
+        'entity_postings_ptr': ptr, 'entity_postings_rows': posting_rows,
+    }
+
+    os.makedirs(FEATURES_FOLDER, exist_ok=True)
+    version = f"v{index.version}-{time.time_ns()}"
+    temporary = os.path.join(FEATURES_FOLDER, f".{version}.tmp")
+    os.makedirs(temporary)
+    for name in ARRAYS:
+        numpy.save(os.path.join(temporary, f"{name}.npy"), arrays[name])
+    with open(os.path.join(temporary, 'meta.json'), 'w') as file:
+        json.dump({'format': FORMAT, 'version': index.version, 'items': len(index.keys), 'labels': labels}, file)
+    path = os.path.join(FEATURES_FOLDER, version)
+    os.rename(temporary, path)
+
+    previous = current_feature_store()
+    with open(CURRENT + '.tmp', 'w') as file:
+        file.write(version)
+    os.replace(CURRENT + '.tmp', CURRENT)
+
+    keep = {path, previous}
+    for name in os.listdir(FEATURES_FOLDER):
+        old = os.path.join(FEATURES_FOLDER, name)
+        if os.path.isdir(old) and old not in keep and not name.startswith('.'):
+            shutil.rmtree(old, ignore_errors=True)
+    return path
+
+
+def open_feature_store(path):
+    """
+    Opens a version of the feature store. The arrays are memory mapped rather than read, so opening a version is fast
+    and the pages are shared by every process using it. The norms are mapped copy-on-write, as the recommender index
+    updates the norm of a row in place when its tags change.
+    :param path: The directory of the version.
+    :return: A tuple of the metadata dictionary and a dictionary of the arrays.
+    """
+    with open(os.path.join(path, 'meta.json')) as file:
+        meta = json.load(file)
+    if meta['format'] != FORMAT:
+        raise ValueError(f"Unsupported feature store format {meta['format']} in {path}")
+    arrays = {name: numpy.load(os.path.join(path, f"{name}.npy"), mmap_mode='c' if name == 'norms' else 'r')
+              for name in ARRAYS}
+    return meta, arrays
@@ -1,17 +1,212 @@
-from app.models import *
-def get_item(item_id, item_type):
-    if item_type == "book":
-        item = Books.query.filter_by(id=item_id).first()
-    elif item_type == "film":
-        item = Films.query.filter_by(id=item_id).first()
-    else:
-        item = Games.query.filter_by(id=item_id).first()
-    return item
-
-def get_item_tags(item_id, item_type):
-    tag_dict = {}
-    item_tags = ItemTags.query.filter_by(item_id=item_id, item_type=item_type).all()
-    for tag in item_tags:
-        tag_dict[tag.tag_id] = tag.count
-    return tag_dict
-
+from app.models import *
+from sqlalchemy import or_, and_, case, tuple_
+import base64
+import itertools
+import json
+from app.search_index import search_matches
+from app.item_cache import get_cached_item, get_items
+def get_item(item_id, item_type):
+    #Items are read from the item cache, so repeated lookups do not query the database.
+    return get_cached_item(item_id, item_type)
+
+def get_item_tags(item_id, item_type):
+    tag_dict = {}
+    item_tags = ItemTags.query.filter_by(item_id=item_id, item_type=item_type).all()
+    for tag in item_tags:
+        tag_dict[tag.tag_id] = tag.count
+    return tag_dict
+
+
+#The item types in the order search results are listed, with the column holding the creator of each item.
+SEARCH_TYPES = ((Books, "book", Books.author), (Films, "film", Films.director), (Games, "game", Games.developer))
+
+
+def search_query(query, model, item_type, creator, full_text=True):
+    """
+    Builds the query for the items of one type matching a search term, selecting each item along with the columns the
+    results are sorted by. With the search_index full-text index, items match if their title or creator has a word
+    starting with each word of the search term, or if they have a tag starting with any word of the search term, and
+    they are sorted by bm25 rank. Without it, or if the search term contains no words, items match if their title or
+    creator contains the search term or they have a tag containing any word of it, and the items matching the title or
+    creator are listed first. A leading wildcard cannot use an index, so the second form scans the item tables.
+    :param query: The search term entered by the user.
+    :param model: The model of the item type.
+    :param item_type: The item type.
+    :param creator: The column holding the creator of the item.
+    :param full_text: Whether to use the full-text index.
+    :return: A tuple of the query and the sort columns. Every item has a distinct value of the sort columns.
+    """
+    matches = search_matches(query, item_type) if full_text else None
+    if matches is not None:
+        sort = (matches.c.rank, model.id)
+        return db.session.query(model, *sort).join(matches, matches.c.item_id == model.id), sort
+
+    tag_matched = or_(*[Tags.tag.ilike(f'%{word}%') for word in query.split(" ")])
+    direct = or_(model.title.ilike(f'%{query}%'), creator.ilike(f'%{query}%'))
+    tagged_ids = db.session.query(ItemTags.item_id).join(Tags).filter(ItemTags.item_type == item_type, tag_matched)
+    sort = (case((direct, 0), else_=1), model.id)
+    return db.session.query(model, *sort).filter(or_(direct, model.id.in_(tagged_ids))), sort
+
+
+def encode_cursor(position, key):
+    """
+    Encodes the position of the last search result on a page as an opaque cursor for the next page.
+    :param position: The position of the item type in SEARCH_TYPES.
+    :param key: The values of the sort columns of the last result, or None to start from the first item of the type.
+    :return: The cursor.
+    """
+    return base64.urlsafe_b64encode(json.dumps([position, key]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor created by encode_cursor.
+    :param cursor: The cursor.
+    :return: A tuple of the position of the item type and the values of the sort columns.
+    :raises ValueError: If the cursor is not valid.
+    """
+    cursor = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(cursor, list) or len(cursor) != 2:
+        raise ValueError("Invalid cursor")
+    position, key = cursor
+    if not isinstance(position, int) or not 0 <= position < len(SEARCH_TYPES):
+        raise ValueError("Invalid cursor")
+    if key is not None and (not isinstance(key, list) or len(key) != 2
+                            or not all(isinstance(value, (int, float)) for value in key)):
+        raise ValueError("Invalid cursor")
+    return position, key
+
+
+def search_page(query, page_size, cursor=None, full_text=True):
+    """
+    Gets one page of search results using keyset pagination. Each page continues from the sort columns of the last result
+    of the previous page, so only the results on the page are loaded, using at most one query per item type and one
+    query for the tags of every result on the page, however far into the results the page is.
+    :param query: The search term entered by the user.
+    :param page_size: The maximum number of results on the page.
+    :param cursor: The cursor returned with the previous page, or None for the first page.
+    :param full_text: Whether to use the full-text index.
+    :return: A tuple of the results and the cursor for the next page, or None if this is the last page. The results are a
+    list of (type, item, tags) tuples, where tags is a list of (tag, count, tag_id) tuples.
+    :raises ValueError: If the cursor is not valid.
+    """
+    position, key = decode_cursor(cursor) if cursor else (0, None)
+    page = []
+    next_cursor = None
+    for type_position in range(position, len(SEARCH_TYPES)):
+        model, item_type, creator = SEARCH_TYPES[type_position]
+        items, sort = search_query(query, model, item_type, creator, full_text)
+        if type_position == position and key is not None:
+            items = items.filter(tuple_(*sort) > tuple(key))
+
+        #Load one more item than is needed to find out whether there is another page.
+        remaining = page_size - len(page)
+        rows = items.order_by(*sort).limit(remaining + 1).all()
+        page += [(item_type, row[0], list(row[1:])) for row in rows[:remaining]]
+        if len(rows) > remaining:
+            next_cursor = encode_cursor(type_position, page[-1][2])
+            break
+        if len(page) == page_size:
+            #The page ended with the last match of this type, so only link to another page if a later type has a match.
+            for later_position in range(type_position + 1, len(SEARCH_TYPES)):
+                later_items, later_sort = search_query(query, *SEARCH_TYPES[later_position], full_text)
+                if later_items.limit(1).first() is not None:
+                    next_cursor = encode_cursor(later_position, None)
+                    break
+            break
+
+    item_tags = search_result_tags(page)
+    return [(item_type, item, item_tags.get((item_type, item.id), [])) for item_type, item, key in page], next_cursor
+
+
+def search_result_tags(results):
+    """
+    Loads the tags of every item in a list of search results with a single query.
+    :param results: A list of tuples starting with the type and the item.
+    :return: A dictionary with (type, id) as the key and a list of (tag, count, tag_id) tuples as the value.
+    """
+    item_tags = {}
+    if not results:
+        return item_tags
+    on_page = or_(*[and_(ItemTags.item_type == item_type,
+                         ItemTags.item_id.in_([result[1].id for result in results if result[0] == item_type]))
+                    for item_type in {result[0] for result in results}])
+    for item_type, item_id, tag, count, tag_id in db.session.query(ItemTags.item_type, ItemTags.item_id, Tags.tag,
+                                                                     ItemTags.count, Tags.tag_id).join(Tags).filter(on_page):
+        item_tags.setdefault((item_type, item_id), []).append((tag, count, tag_id))
+    return item_tags
+
+
+def iter_search_results(query, batch_size=500, full_text=True):
+    """
+    Yields every search result, streaming the rows of one query per item type from the database in batches, so only one
+    batch is held in memory however many items match. The tags of each batch are loaded with a single query.
+    :param query: The search term entered by the user.
+    :param batch_size: The number of results loaded at once.
+    :param full_text: Whether to use the full-text index.
+    :return: A generator of (type, item, tags) tuples, in the same format as search_page.
+    """
+    for model, item_type, creator in SEARCH_TYPES:
+        items, sort = search_query(query, model, item_type, creator, full_text)
+        rows = iter(items.order_by(*sort).yield_per(batch_size))
+        while True:
+            batch = [(item_type, row[0]) for row in itertools.islice(rows, batch_size)]
+            if not batch:
+                break
+            item_tags = search_result_tags(batch)
+            for result_type, item in batch:
+                yield result_type, item, item_tags.get((result_type, item.id), [])
+
+
+def search_catalogue(query, full_text=True):
+    """
+    Gets every search result for a search term. This loads every result into memory, so search_page or
+    iter_search_results should be used where the number of results is not bounded.
+    :param query: The search term entered by the user.
+    :param full_text: Whether to use the full-text index.
+    :return: A list of (type, item, tags) tuples, in the same format as search_page.
+    """
+    return list(iter_search_results(query, full_text=full_text))
+
+
+def serialise_search_result(item_type, item, tags):
+    """
+    Converts a search result into the dictionary passed to the front end.
+    :param item_type: The type of the item.
+    :param item: The item.
+    :param tags: A list of (tag, count, tag_id) tuples.
+    :return: A dictionary containing the type, item and tags of the result.
+    """
+    if item_type == "book":
+        serialised = {'id': item.id, 'title': item.title, 'author': item.author, 'isbn': item.isbn, 'cover': item.cover, 'type': 'book'}
+    elif item_type == "film":
+        serialised = {'id': item.id, 'title': item.title, 'director': item.director, 'year': item.year, 'cover': item.cover, 'type': 'film'}
+    else:
+        serialised = {'id': item.id, 'title': item.title, 'developer': item.developer, 'year': item.year, 'cover': item.cover, 'type': 'game'}
+    return {
+        'type': item_type,
+        'item': serialised,
+        'tags': [{'tag': tag[0], 'count': tag[1], 'id': tag[2]} for tag in tags],
+    }
+
+
+def find_item(title, item_type):
+    """
+    Finds the item of a type which best matches a title, using the search_index full-text index. An item with exactly the
+    given title is preferred, followed by the best bm25 rank. If no item matches, the first item whose title contains the
+    given title is used instead.
+    :param title: The title entered by the user.
+    :param item_type: The type of the item.
+    :return: The item, or None if no item matches.
+    """
+    model = {"book": Books, "film": Films, "game": Games}[item_type]
+
+    #An exact title can be found with the index on the title column, without ranking every match.
+    item = model.query.filter(model.title == title).first()
+    matches = search_matches(title, item_type, columns=("title",), tags=False)
+    if item is None and matches is not None:
+        exact = case((db.func.lower(model.title) == title.lower(), 0), else_=1)
+        item = model.query.join(matches, matches.c.item_id == model.id).order_by(exact, matches.c.rank, model.id).first()
+    if item is None:
+        item = model.query.filter(model.title.ilike(f'%{title}%')).first()
+    return item
@@ -0,0 +1,123 @@
+from app import app
+from app.models import *
+from app.node_id import NodeId
+from collections import OrderedDict
+import threading
+import time
+
+
+class GraphCache:
+    """
+    A bounded LRU cache of the serialised graph and database info JSON rendered by the '/visualise' endpoint, keyed by
+    (item id, medium, weighting, top_nodes). Entries expire after ttl seconds, and the least recently used entry is
+    discarded once the cache is full.
+
+    Every change to an item's tags or title is written to the IndexChanges table, so before each lookup the cache reads
+    the changes made since it last looked, by this process or any other, and discards every entry whose graph contains
+    a changed item. A reverse index from each item to the keys of the graphs containing it makes this cheap.
+    """
+
+    def __init__(self, max_entries, ttl):
+        """
+        :param max_entries: The maximum number of graphs to keep.
+        :param ttl: The number of seconds a graph is kept for.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.item_keys = {}
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Gets a graph from the cache, after discarding any graphs containing items which have changed.
+        :param key: The (item id, medium, weighting, top_nodes) tuple.
+        :return: The cached value, or None if the graph is not cached.
+        """
+        with self.lock:
+            self.catch_up()
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    self.discard(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, nodes, value):
+        """
+        Adds a graph to the cache.
+        :param key: The (item id, medium, weighting, top_nodes) tuple.
+        :param nodes: The nodes of the graph.
+        :param value: The value to cache.
+        """
+        items = [NodeId.parse(node) for node in nodes]
+        with self.lock:
+            self.discard(key)
+            self.entries[key] = (time.time() + self.ttl, items, value)
+            for item in items:
+                self.item_keys.setdefault(item, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self.discard(next(iter(self.entries)))
+
+    def discard(self, key):
+        """
+        Removes a graph from the cache and from the reverse index. The caller must hold the lock.
+        :param key: The (item id, medium, weighting, top_nodes) tuple.
+        """
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for item in entry[1]:
+            keys = self.item_keys.get(item)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.item_keys[item]
+
+    def invalidate(self, item_id, item_type):
+        """
+        Removes every graph containing an item. The caller must hold the lock.
+        :param item_id: The ID of the item.
+        :param item_type: The type of the item.
+        """
+        for key in list(self.item_keys.get((int(item_id), item_type), ())):
+            self.discard(key)
+
+    def catch_up(self):
+        """
+        Removes every graph containing an item written to the IndexChanges table since the last lookup, with a single
+        query. The caller must hold the lock.
+        """
+        if self.version is None:
+            self.version = db.session.query(db.func.max(IndexChanges.seq)).scalar() or 0
+            return
+        changes = db.session.query(IndexChanges.seq, IndexChanges.item_id, IndexChanges.item_type)\
+            .filter(IndexChanges.seq > self.version).order_by(IndexChanges.seq).all()
+
+        #Entries are only ever pruned from the start of the log, so a gap means changes this cache has not seen have been
+        #pruned, and any graph may be stale.
+        if changes and changes[0][0] > self.version + 1:
+            self.entries.clear()
+            self.item_keys.clear()
+        for seq, item_id, item_type in changes:
+            self.invalidate(item_id, item_type)
+            self.version = seq
+
+    def stats(self):
+        """
+        Gets the hit and miss counters of the cache.
+        :return: A dictionary of the counters and the number of cached graphs.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries),
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+graph_cache = GraphCache(app.config['GRAPH_CACHE_SIZE'], app.config['GRAPH_CACHE_TTL'])
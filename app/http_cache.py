@@ -0,0 +1,106 @@
+from flask import request, Response
+import gzip
+import hashlib
+
+#Brotli is listed in requirements.txt, but responses fall back to gzip if it is not installed.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def make_etag(*parts):
+    """
+    Makes a strong ETag from the values which decide the content of a response, such as the version of the recommender
+    index and the request parameters.
+    :param parts: The values.
+    :return: The ETag, without quotes.
+    """
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def negotiate_encoding():
+    """
+    Chooses the content encoding of the response to the current request from its Accept-Encoding header, preferring
+    Brotli to gzip.
+    :return: "br", "gzip" or "identity".
+    """
+    if brotli is not None and request.accept_encodings['br']:
+        return "br"
+    if request.accept_encodings['gzip']:
+        return "gzip"
+    return "identity"
+
+
+def representation_etag(etag):
+    """
+    Gets the ETag of the representation sent to the current request. A strong ETag must change with the bytes sent, so
+    the encoding is added to the ETag of the content.
+    :param etag: The ETag of the content.
+    :return: The ETag of the representation.
+    """
+    return f"{etag}-{negotiate_encoding()}"
+
+
+def prepare_response(response, etag):
+    """
+    Sets the caching headers of a response. Browsers keep the response but must check it is still current before using
+    it again.
+    :param response: The response.
+    :param etag: The ETag of the representation.
+    :return: The response.
+    """
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def not_modified(etag):
+    """
+    Checks whether the browser already holds the current representation, before any work is done to build it.
+    :param etag: The ETag of the content.
+    :return: An empty 304 response, or None if the representation must be sent.
+    """
+    tag = representation_etag(etag)
+    if request.if_none_match.contains(tag):
+        return prepare_response(Response(status=304), tag)
+    return None
+
+
+def encode_body(body, encoding):
+    """
+    Compresses the body of a response.
+    :param body: The body as bytes.
+    :param encoding: "br", "gzip" or "identity".
+    :return: The encoded body.
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def cached_response(body, etag, mimetype, encoded=None):
+    """
+    Builds a compressed response with an ETag, or a 304 response if the browser already holds it.
+    :param body: The body as bytes.
+    :param etag: The ETag of the content.
+    :param mimetype: The mimetype of the body.
+    :param encoded: A dictionary of bodies already encoded, with the encoding as the key. Encodings which are missing
+    are added to it, so the body is only compressed once for each encoding.
+    :return: The response.
+    """
+    not_modified_response = not_modified(etag)
+    if not_modified_response is not None:
+        return not_modified_response
+    encoding = negotiate_encoding()
+    if encoded is None:
+        encoded = {}
+    if encoding not in encoded:
+        encoded[encoding] = encode_body(body, encoding)
+    response = Response(encoded[encoding], mimetype=mimetype)
+    if encoding != "identity":
+        response.headers['Content-Encoding'] = encoding
+    return prepare_response(response, f"{etag}-{encoding}")
@@ -0,0 +1,150 @@
+from app import app
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+import threading
+import time
+import requests
+
+#IGDB returns 10 results unless a limit is given, and at most 500.
+MAX_LIMIT = 500
+
+
+class IGDBClient:
+    """
+    A client for the IGDB API. Requests are made through one requests.Session, so connections to IGDB are kept open and
+    reused, and the Twitch access token is cached until shortly before it expires rather than requested for every game.
+    Lookups of several records are batched into a single "where id = (a,b,c)" query per endpoint, and the queries to
+    different endpoints are made concurrently from a small thread pool.
+    """
+
+    def __init__(self, client_id, client_secret, api_url, token_url, timeout=10, workers=4):
+        """
+        :param client_id: The Twitch client ID.
+        :param client_secret: The Twitch client secret.
+        :param api_url: The base URL of the IGDB API.
+        :param token_url: The URL of the Twitch OAuth token endpoint.
+        :param timeout: The number of seconds to wait for each response.
+        :param workers: The number of requests made at once.
+        """
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.api_url = api_url.rstrip('/')
+        self.token_url = token_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=workers))
+        self.session.mount('http://', HTTPAdapter(pool_connections=2, pool_maxsize=workers))
+        self.executor = ThreadPoolExecutor(workers)
+        self.access_token = None
+        self.expires = 0
+        self.lock = threading.Lock()
+
+    def token(self):
+        """
+        Gets an access token, requesting a new one if there is none or the cached one expires within a minute.
+        :return: The access token.
+        """
+        with self.lock:
+            if self.access_token is None or time.time() > self.expires - 60:
+                response = self.session.post(self.token_url, params={'client_id': self.client_id,
+                                                                     'client_secret': self.client_secret,
+                                                                     'grant_type': 'client_credentials'},
+                                             timeout=self.timeout)
+                response.raise_for_status()
+                info = response.json()
+                self.access_token = info['access_token']
+                self.expires = time.time() + info.get('expires_in', 0)
+            return self.access_token
+
+    def query(self, endpoint, body):
+        """
+        Makes a query to an IGDB endpoint. If the token has been revoked the query is made once more with a new token.
+        :param endpoint: The name of the endpoint, such as "games".
+        :param body: The Apicalypse query.
+        :return: The list of records returned.
+        """
+        for attempt in range(2):
+            token = self.token()
+            response = self.session.post(f"{self.api_url}/{endpoint}", data=body, timeout=self.timeout,
+                                         headers={'Client-ID': self.client_id, 'Authorization': f"Bearer {token}"})
+            if response.status_code == 401 and attempt == 0:
+                with self.lock:
+                    if self.access_token == token:
+                        self.access_token = None
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    def find(self, endpoint, ids):
+        """
+        Gets the records of an endpoint with the given IDs, with one query per 500 IDs.
+        :param endpoint: The name of the endpoint.
+        :param ids: An iterable of IDs.
+        :return: A dictionary with the ID as the key and the record as the value.
+        """
+        ids = sorted(set(ids))
+        records = {}
+        for start in range(0, len(ids), MAX_LIMIT):
+            batch = ids[start:start + MAX_LIMIT]
+            body = f"fields *; where id = ({','.join(str(record_id) for record_id in batch)}); limit {len(batch)};"
+            for record in self.query(endpoint, body):
+                records[record['id']] = record
+        return records
+
+    def find_all(self, lookups):
+        """
+        Makes several lookups concurrently.
+        :param lookups: A dictionary with a name as the key and an (endpoint, ids) tuple as the value.
+        :return: A dictionary with the name as the key and the records found by find as the value.
+        """
+        futures = {name: self.executor.submit(self.find, endpoint, ids) for name, (endpoint, ids) in lookups.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def search_games(self, title):
+        """
+        Searches IGDB for games by title.
+        :param title: The title entered by the user.
+        :return: The list of games found.
+        """
+        title = title.replace('\\', '\\\\').replace('"', '\\"')
+        return self.query("games", f'fields *; search "{title}";')
+
+    def game_details(self, games):
+        """
+        Gets the cover URL and the developer of a list of games. The covers and the involved companies of every game are
+        looked up concurrently, and then the companies are looked up, so there are three queries however many games
+        there are. The developer is the first involved company of the game.
+        :param games: A list of games returned by search_games.
+        :return: A dictionary with the game ID as the key and a (cover URL, developer) tuple as the value. Games without
+        a cover or an involved company are left out.
+        """
+        games = [game for game in games if game.get('cover') and game.get('involved_companies')]
+        found = self.find_all({'covers': ("covers", [game['cover'] for game in games]),
+                               'involved': ("involved_companies", [game['involved_companies'][0] for game in games])})
+        companies = self.find("companies", [involved['company'] for involved in found['involved'].values()])
+
+        details = {}
+        for game in games:
+            cover = found['covers'].get(game['cover'])
+            involved = found['involved'].get(game['involved_companies'][0])
+            company = companies.get(involved['company']) if involved is not None else None
+            if cover is not None and company is not None:
+                details[game['id']] = (cover['url'], company['name'])
+        return details
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_igdb_client():
+    """
+    Gets the IGDB client of this process, creating it from the IGDB settings the first time it is needed.
+    :return: The IGDBClient.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = IGDBClient(app.config['IGDB_CLIENT_ID'], app.config['IGDB_CLIENT_SECRET'],
+                                 app.config['IGDB_API_URL'], app.config['IGDB_TOKEN_URL'])
+        return _client
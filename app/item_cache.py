@@ -0,0 +1,90 @@
+from app import app
+from app.models import *
+from collections import OrderedDict
+import threading
+
+
+class ItemRecord:
+    """
+    The metadata of an item, held by the item cache. Records use __slots__ so a large cache stays small, and have the same
+    attribute names as the model they are read from.
+    """
+    __slots__ = ()
+    model = None
+    columns = ()
+
+    def __init__(self, values):
+        """
+        :param values: The values of the columns, in the same order as columns.
+        """
+        for column, value in zip(self.columns, values):
+            setattr(self, column, value)
+
+
+class BookRecord(ItemRecord):
+    __slots__ = ('id', 'title', 'author', 'year', 'publisher', 'isbn', 'cover')
+    model = Books
+    columns = __slots__
+
+
+class FilmRecord(ItemRecord):
+    __slots__ = ('id', 'title', 'director', 'year', 'production_company', 'cover')
+    model = Films
+    columns = __slots__
+
+
+class GameRecord(ItemRecord):
+    __slots__ = ('id', 'title', 'developer', 'year', 'cover')
+    model = Games
+    columns = __slots__
+
+
+RECORD_TYPES = {"book": BookRecord, "film": FilmRecord, "game": GameRecord}
+
+_items = OrderedDict()
+_items_lock = threading.Lock()
+
+
+def get_items(keys):
+    """
+    Gets the metadata of a list of items from the item cache shared by this process. Items which are not cached are
+    loaded with one IN query per item type. Items are never edited once added, so cached records do not go out of date.
+    :param keys: A list of (id, type) tuples.
+    :return: A dictionary with the (id, type) tuple as the key and the record as the value. Items which do not exist are
+    left out.
+    """
+    keys = [(int(item_id), item_type) for item_id, item_type in keys]
+    found = {}
+    missing = {}
+    with _items_lock:
+        for key in keys:
+            record = _items.get(key)
+            if record is None:
+                missing.setdefault(key[1], set()).add(key[0])
+            else:
+                _items.move_to_end(key)
+                found[key] = record
+
+    for item_type, ids in missing.items():
+        record_type = RECORD_TYPES[item_type]
+        model = record_type.model
+        rows = db.session.query(*[getattr(model, column) for column in record_type.columns])\
+            .filter(model.id.in_(ids)).all()
+        with _items_lock:
+            for row in rows:
+                record = record_type(row)
+                _items[record.id, item_type] = record
+                found[record.id, item_type] = record
+            while len(_items) > app.config['ITEM_CACHE_SIZE']:
+                _items.popitem(last=False)
+    return found
+
+
+def get_cached_item(item_id, item_type):
+    """
+    Gets the metadata of a single item from the item cache.
+    :param item_id: The ID of the item.
+    :param item_type: The type of the item.
+    :return: The record, or None if the item does not exist.
+    """
+    return get_items([(item_id, item_type)]).get((int(item_id), item_type))
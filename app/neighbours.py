@@ -0,0 +1,91 @@
+from app.models import *
+import time
+import numpy
+
+
+def start_build(k, version):
+    """
+    Records the start of a new build of the neighbours table. The build is not used by stored_neighbours until
+    finish_build is called, so the previous build keeps being served while the new one is written.
+    :param k: The number of neighbours stored for each item.
+    :param version: The seq of the last IndexChanges entry included in the recommender index used for the build.
+    :return: The new NeighbourBuilds entry.
+    """
+    build = NeighbourBuilds(version=version, k=k, timestamp=int(time.time()), complete=False)
+    db.session.add(build)
+    db.session.commit()
+    return build
+
+
+def add_neighbours(build, item_id, item_type, neighbours):
+    """
+    Adds the neighbours of one item to a build. The caller is responsible for committing.
+    :param build: The NeighbourBuilds entry returned by start_build.
+    :param item_id: The ID of the item.
+    :param item_type: The type of the item.
+    :param neighbours: A dictionary of (id, type) tuples and scores ordered from the highest score to the lowest, as
+    returned by calculate_recommender when top_n is given.
+    """
+    db.session.add_all([Neighbours(build_id=build.build_id, item_id=item_id, item_type=item_type, rank=rank,
+                                   neighbour_id=key[0], neighbour_type=key[1], score=score)
+                        for rank, (key, score) in enumerate(neighbours.items())])
+
+
+def finish_build(build):
+    """
+    Marks a build as complete so it is served by stored_neighbours, and deletes every older build.
+    :param build: The NeighbourBuilds entry returned by start_build.
+    """
+    build.complete = True
+    Neighbours.query.filter(Neighbours.build_id < build.build_id).delete()
+    NeighbourBuilds.query.filter(NeighbourBuilds.build_id < build.build_id).delete()
+    db.session.commit()
+
+
+def stored_neighbours(index, item_id, item_type, weighting, top_n):
+    """
+    Gets the top_n neighbours of an item scoring at least the weighting from the latest complete build of the neighbours
+    table. Each build keeps the top K items of every item with a threshold of 0, so filtering them by the weighting gives
+    the same items and scores as calculate_recommender for any top_n up to K, as long as nothing which could change them
+    has been written to the IndexChanges table since the build.
+
+    The stored neighbours are not used if any item has been added or renamed since the build, or if the tags of the item
+    or of one of its stored neighbours have changed. Any other item whose tags have changed is scored against the item,
+    and the stored neighbours are only used if none of them could now score as high as the lowest stored neighbour.
+    :param index: The RecommenderIndex, caught up with the IndexChanges table.
+    :param item_id: The ID of the item.
+    :param item_type: The type of the item.
+    :param weighting: The weighting threshold.
+    :param top_n: The number of neighbours to return.
+    :return: A list of ((id, type), score) tuples ordered from the highest score to the lowest, or None if there is no
+    complete build, top_n is larger than K, or the stored neighbours may no longer be the top K.
+    """
+    build = NeighbourBuilds.query.filter_by(complete=True).order_by(NeighbourBuilds.build_id.desc()).first()
+    if build is None or top_n > build.k:
+        return None
+
+    #Any item added or renamed since the build could be a new neighbour of every item.
+    if IndexChanges.query.filter(IndexChanges.seq > build.version, IndexChanges.title.isnot(None)).first() is not None:
+        return None
+    changed = set(db.session.query(IndexChanges.item_id, IndexChanges.item_type)
+                  .filter(IndexChanges.seq > build.version).distinct())
+    key = (int(item_id), item_type)
+    if key in changed:
+        return None
+
+    neighbours = Neighbours.query.filter(Neighbours.build_id == build.build_id, Neighbours.item_id == int(item_id),
+                                         Neighbours.item_type == item_type).order_by(Neighbours.rank).all()
+    stored = [((neighbour.neighbour_id, neighbour.neighbour_type), neighbour.score) for neighbour in neighbours]
+    if any(neighbour in changed for neighbour, score in stored):
+        return None
+
+    #An item whose tags have changed could now score higher than the lowest stored neighbour. Ties are treated as
+    #changes too, as they are broken by the position of the item in the catalogue.
+    if changed and stored:
+        from app.recommender import score_rows
+        initial_row = index.rows[key]
+        rows = numpy.array([index.rows[other] for other in changed if other in index.rows], dtype=numpy.int64)
+        scores = score_rows(index, initial_row, rows, index.tag_similarities(initial_row, rows))
+        if any(score >= stored[-1][1] for score in scores):
+            return None
+    return [(neighbour, score) for neighbour, score in stored if score >= weighting][:top_n]
@@ -0,0 +1,28 @@
+from typing import NamedTuple
+
+
+class NodeId(NamedTuple):
+    """
+    Identifies an item in the knowledge graph. A NodeId is a tuple, so it is equal to and hashes the same as the
+    (id, type) tuple of the item. The recommender index holds one NodeId per item, and every graph uses those instances,
+    so a node is only converted to the "id type" string used by the front end when the graph is serialised.
+    """
+    id: int
+    type: str
+
+    def __str__(self):
+        return f"{self.id} {self.type}"
+
+    @classmethod
+    def parse(cls, node):
+        """
+        Converts a node in any of the forms used by the graph into a NodeId.
+        :param node: A NodeId, an (id, type) tuple or an "id type" string.
+        :return: The NodeId.
+        """
+        if isinstance(node, cls):
+            return node
+        if isinstance(node, str):
+            item_id, item_type = node.split(" ")
+            return cls(int(item_id), item_type)
+        return cls(int(node[0]), node[1])
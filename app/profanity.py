@@ -0,0 +1,72 @@
+from app import app
+from app.models import *
+from collections import OrderedDict
+import threading
+
+#The profanity_check model is loaded the first time a tag is not in the cache, as importing it takes over a second.
+_predict = None
+
+#The normalised text of every tag in the Tags table. Tags were checked before they were added, so they are not profane.
+_tags = None
+
+#The verdicts of the model for strings which are not tags, most recently used last. Most of these are rejected strings.
+_verdicts = OrderedDict()
+_lock = threading.Lock()
+
+
+def normalise_tag(tag):
+    """
+    Normalises a tag for the profanity cache. The model lowercases its input, so tags differing only in case get the
+    same verdict.
+    :param tag: The text of the tag.
+    :return: The normalised text.
+    """
+    return tag.lower()
+
+
+def predict_profanity(tags):
+    """
+    Checks a list of tags for profanity. Tags already in the Tags table and strings checked before are answered from
+    the cache, and the rest are checked by the model together.
+    :param tags: A list of tags.
+    :return: A list with 1 for each profane tag and 0 for each other tag, in the same order as tags.
+    """
+    global _predict, _tags
+    normalised = [normalise_tag(tag) for tag in tags]
+    with _lock:
+        if _tags is None:
+            _tags = {normalise_tag(tag) for tag, in db.session.query(Tags.tag)}
+        verdicts = {}
+        for tag in normalised:
+            if tag in _tags:
+                verdicts[tag] = 0
+            elif tag in _verdicts:
+                _verdicts.move_to_end(tag)
+                verdicts[tag] = _verdicts[tag]
+    missing = list(dict.fromkeys(tag for tag in normalised if tag not in verdicts))
+
+    if missing:
+        if _predict is None:
+            from profanity_check import predict
+            _predict = predict
+        predictions = [int(prediction) for prediction in _predict(missing)]
+        with _lock:
+            for tag, prediction in zip(missing, predictions):
+                verdicts[tag] = _verdicts[tag] = prediction
+                _verdicts.move_to_end(tag)
+            while len(_verdicts) > app.config['PROFANITY_CACHE_SIZE']:
+                _verdicts.popitem(last=False)
+    return [verdicts[tag] for tag in normalised]
+
+
+def remember_tags(tags):
+    """
+    Adds new tags to the cache once they have been added to the Tags table.
+    :param tags: A list of tags.
+    """
+    with _lock:
+        if _tags is not None:
+            for tag in tags:
+                tag = normalise_tag(tag)
+                _tags.add(tag)
+                _verdicts.pop(tag, None)
@@ -1,35 +1,43 @@
-import os
-import json
-def add_recent(item):
-    """
-    Keeps a JSON file containing the 4 most recently added items to the database. These are then rendered on the "Recently Added"
-    section of the page. Items added are appended to the front of the JSON list, and the last item is removed. This ensures that 
-    the most recent item is rendered at the top of the list on the application.
-    :param item: The information for the item containing hte title, url for the cover, year of release and timestamp it was added.
-    """
-    #Get the filepath for the JSON file.
-    filepath = os.path.join(os.getcwd(), 'app', 'static', 'recently_added.json')
-    try:
-        with open(filepath, "r") as file:
-            data=json.load(file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = []
-
-    #Format the new item as JSON to write it to the JSON file.
-    new_item = {
-        "title": item[0],
-        "year": item[1],
-        "cover": item[2],
-        "timestamp": item[3]
-    }
-
-    #Append our new item to the list which will be written to the JSON file.
-    data.insert(0, new_item)
-
-    #Remove the oldest item if the length is too long.
-    if len(data) > 4:
-        data.pop()
-
-    #Write the changes to the JSON file.
-    with open(filepath, "w") as file:
-        json.dump(data, file, indent=4)
\ No newline at end of file
+from app.models import *
+import json
+
+#The number of items shown in the "Recently Added" section of the page.
+RECENT_ITEMS = 4
+
+#The serialised feed of this process, as a (newest ID, JSON, last modified) tuple. It is replaced as a whole rather than
+#changed in place, so requests read it without a lock.
+_feed = (None, '[]', None)
+
+
+def add_recent(item):
+    """
+    Adds an item to the "Recently Added" section of the page. The section is a ring buffer of the RECENT_ITEMS most
+    recently added items, kept in the recent_item table. The new row is inserted and the rows which fall out of the
+    buffer are deleted in the same transaction, so items added by several workers at once are all kept in order.
+    :param item: The information for the item containing the title, the year of release, the url for the cover and the
+    datetime it was added.
+    """
+    db.session.add(RecentItems(title=item[0], year=item[1], cover=item[2] or '', timestamp=item[3]))
+    db.session.flush()
+
+    #Remove every row older than the newest RECENT_ITEMS.
+    newest = db.session.query(RecentItems.id).order_by(RecentItems.id.desc()).limit(RECENT_ITEMS)
+    db.session.query(RecentItems).filter(RecentItems.id.not_in(newest.scalar_subquery()))\
+        .delete(synchronize_session=False)
+    db.session.commit()
+
+
+def recent_feed():
+    """
+    Gets the "Recently Added" items as JSON, most recent first. The JSON is only rebuilt when an item has been added
+    since it was last built, by this process or any other, which is found with a single lookup of the newest ID.
+    :return: A tuple of the newest ID, the JSON, and the datetime the newest item was added.
+    """
+    global _feed
+    newest_id = db.session.query(db.func.max(RecentItems.id)).scalar()
+    if newest_id != _feed[0]:
+        items = RecentItems.query.order_by(RecentItems.id.desc()).limit(RECENT_ITEMS).all()
+        data = [{"title": item.title, "year": item.year, "cover": item.cover,
+                 "timestamp": item.timestamp.strftime('%Y-%m-%d %H:%M:%S')} for item in items]
+        _feed = (items[0].id if items else None, json.dumps(data), items[0].timestamp if items else None)
+    return _feed
@@ -1,252 +1,441 @@
-from app.models import *
-import Levenshtein
-from app.get_info import *
-import networkx as nx
-import numpy
-import math
-import spacy
-
-nlp_entity = spacy.load('en_core_web_sm')
-
-def generate_graph(item_id, item_type, weighting, top_n):
-    """
-    This function generates a knowledge graph which will be passed to the 'visualise.html' template for rendering by
-    the client using D3.js. This graph consists of nodes (items in the DB) and edges (the similarity score between two items).
-    :param item_id: The ID of the initial node.
-    :param item_type: The type of the initial node.
-    :param weighting: The weighting specified by the user.
-    :param top_n: The size of the graph specified by the user.
-    :return graph: The networkx graph object.
-    """
-    graph = nx.Graph()
-    weighting = float(weighting) / 10
-    initial = f"{item_id} {item_type}"
-    graph.add_node(initial)
-    related = calculate_recommender(item_id, item_type, weighting)
-    top_nodes = sorted(related.items(), key=lambda x: x[1], reverse=True)[:int(top_n)]
-    top_node_ids = {f"{k[0]} {k[1]}" for k, v in top_nodes}
-
-    graph.add_nodes_from(top_node_ids)
-
-    for node1 in top_node_ids:
-        for node2 in top_node_ids:
-            if node1 != node2:
-                similarity = compare_nodes(node1, node2)
-                if similarity >= float(weighting) * 10:
-                    graph.add_edge(node1, node2, weight=round(similarity))
-    return graph
-
-
-def calculate_recommender(item_id, item_type, weighting):
-    """
-    This function creates a list of items that will form part of the knowledge graph. This is done by querying the database,
-    calculating the similarity score for each item and appending it to related should the weighting of the item exceed the
-    threshold specified by the user.
-    :param item_id: The ID of the initial node.
-    :param item_type: The type of the initial node.
-    :param weighting: The weighting threshold specified by the user.
-    :return related: A dictionary of nodes to be added to the knowledge graph.
-    """
-
-    #Create the related dictionary and get info about the initial node.
-    related = {}
-    initial_item = get_item(item_id, item_type)
-    initial_tags = get_item_tags(item_id, item_type)
-
-    #Query the Books, Films and Games table and calculate the similarity score between items.
-    for book in Books.query.all():
-        book_tags = get_item_tags(book.id, "book")
-        similarity = calculate_similarity(initial_item.title, book.title, initial_tags, book_tags)
-        if similarity >= float(weighting):
-            related[book.id, "book"] = similarity
-    for film in Films.query.all():
-        film_tags = get_item_tags(film.id, "film")
-        similarity = calculate_similarity(initial_item.title, film.title, initial_tags, film_tags)
-        if similarity >= float(weighting):
-            related[film.id, "film"] = similarity
-    for game in Games.query.all():
-        game_tags = get_item_tags(game.id, "game")
-        similarity= calculate_similarity(initial_item.title, game.title, initial_tags, game_tags)
-        if similarity >= float(weighting):
-            related[game.id, "game"] = similarity
-    return related
-
-
-def calculate_similarity(title1, title2, tags1, tags2):
-    """
-    Calculates the similarity between two nodes in the networkx graph. This is used to determine the strength of the
-    similarity between the two nodes.
-    :param title1: The title of the first node.
-    :param title2: The title of the second node.
-    :param tags1: The tags of the first node.
-    :param tags2: The tags of the second node.
-    :return: 0 if no similarity is detected or one of the items is incomplete, otherwise a value between 0 and 1 which is
-    the similarity score. A higher value indicates a stronger similarity.
-    """
-
-    #Extract entities associated with the two titles.
-    entities_title1 = extract_entities(title1)
-    entities_title2 = extract_entities(title2)
-
-    #Calcualte title similarity, cosine similarity and entity similarity.
-    title_similarity = float(title_sum(title1, title2))
-    tags_similarity = float(cosine_similarity(tags1, tags2))
-    entity_similarity = float(entities_similarity(entities_title1, entities_title2))
-
-    score = round(float((title_similarity * 0.3) +(tags_similarity * 0.6) + (entity_similarity * 0.1)), 2) * 10
-    return 0 if math.isnan(score) else score
-
-
-def compare_nodes(node1, node2):
-    """
-    Compares the similarity of two nodes in the graph by gathering the required parts used to calculate similarity.
-    Then passes this to the calculate similarity function to generate a similarity score which is returned to the
-    user.
-    :param node1: The first node of the graph.
-    :param node2: The second node of the graph.
-    :return: Returns the value of the calculate_similarity function when applied to the two nodes.
-    """
-    # Extract IDs and types from the nodes
-    id1, type1 = node1.split()
-    id2, type2 = node2.split()
-
-    # Get the items and their tags
-    item1 = get_item(id1, type1)
-    item2 = get_item(id2, type2)
-    tags1 = get_item_tags(id1, type1)
-    tags2 = get_item_tags(id2, type2)
-
-    # Calculate similarity using the same logic
-    return calculate_similarity(item1.title, item2.title, tags1, tags2)
-
-
-def cosine_similarity(initial_tags, other_tags):
-    """
-    Calculates the cosine similarity between two sets of tags.
-    This is the dot product of the two sets of tags divided by the magnitude of them both.
-
-    :param initial_tags: The tags for the first item.
-    :param other_tags: The tags for the second item.
-    :return cs: The cosine similarity number
-    """
-    all_tags = set.union(set(initial_tags.keys()), set(other_tags.keys()))
-
-    #Get the tags vectors to perform the dot product on, set by default to 0 if the tag is not present in one of the items.
-    initial_tags_vector = [initial_tags.get(tag, 0) for tag in all_tags]
-    other_tags_vector = [other_tags.get(tag, 0) for tag in all_tags]
-
-    #Use numpy to perform the dot product calculation
-    dot_product = numpy.dot(initial_tags_vector, other_tags_vector)
-
-    #Calculate the magnitudes of the two vectors of tags using numpy.
-    initial_magnitude = numpy.sqrt(numpy.dot(initial_tags_vector, initial_tags_vector))
-    other_magnitude = numpy.sqrt(numpy.dot(other_tags_vector, other_tags_vector))
-
-    #Calculate the cosine similarity
-    cs = dot_product / (initial_magnitude * other_magnitude)
-
-    return cs
-
-def title_sum(item1_title, item2_title):
-    """
-    Calculates the Levenshtein similarity between two titles. This works by calculating the number of character changes
-    required to translate one title into another title. This is implemented using the Levenshtein Python module.
-    :param item1_title: The first title string.
-    :param item2_title: The second title string.
-    :return: The Levenshtein ratio number.
-    """
-    return Levenshtein.ratio(item1_title, item2_title)
-
-def extract_entities(title):
-    """
-    This function uses the spacy model to extract entities from the title of an item.
-    :param title: The title of an item
-    :return entities: A dictionary of entities containing the text as a key and the entity as a value.
-    """
-    #Get entities from title.
-    title = nlp_entity(title)
-    entities = {}
-
-    #Store these entities as a dictionary, with the key as the text and the value as the entity label given by spacy.
-    for string in title.ents:
-        entities[string.text] = string.label_
-    return entities
-
-def entities_similarity(entities1, entities2):
-    """
-    Uses the spacy model to calculate the entity similarity. This is done by comparing the common entities to total entities
-    to produce a ratio of entities in common between two items ranging from 0-1 . A higher value indicates stronger similarity
-    between the two entities.
-    :param entities1: A list of entities from the first item.
-    :param entities2: A list of entities for the second item.
-    :return: The ratio of common entities shared by both items.
-    """
-    common_entities = set(entities1.keys()).intersection(set(entities2.keys()))
-    total_entities = len(entities1) + len(entities2)
-
-    #Make sure to return 0 if no entities are identified.
-    if total_entities == 0:
-        return 0
-    return len(common_entities) / (total_entities - len(common_entities))
-
-#Prepare the graph to be JSONified.
-def serialise_graph(graph):
-    """
-    This function serialises the graph in a format that can then be converted to JSON for rendering by D3.js on the front-end.
-    :param graph: The Graph object created by networkx.
-    :return: The nodes and edges of the graph in a JSON format.
-    """
-    nodes = [{"id": node} for node in graph.nodes()]
-    links = []
-    for u, v, data in graph.edges(data=True):
-        links.append({
-            "source": u,
-            "target": v,
-            "weight": data.get("weight")
-        })
-    return {
-        "nodes": nodes,
-        "links": links
-    }
-
-
-def database_info(nodes):
-    """
-    Generates the database info to be passed to the front end in JSON. This information is then used to provide information
-    about the items in the knowledge graph visualisation.
-    :param nodes: The nodes of the knowledge graph.
-    :return db_info: A dictionary containing the node as a key and database info as the value.
-    """
-    db_info = {}
-
-    #Iterate through nodes. split into parts, the first being the ID and the second being the type. Append to db_info.
-    for node in nodes:
-        split = node.split(" ")
-        if split[1] == "book":
-            entry = Books.query.filter_by(id=int(split[0])).first()
-            db_info[node] = {
-                'Title': entry.title,
-                'Author': entry.author,
-                'Year': entry.year,
-                'Publisher': entry.publisher,
-                'Cover': entry.cover,
-            }
-        elif split[1] == "film":
-            entry = Films.query.filter_by(id=split[0]).first()
-            db_info[node] = {
-                'Title': entry.title,
-                'Director': entry.director,
-                'Year': entry.year,
-                'Production Company': entry.production_company,
-                'Cover': entry.cover,
-            }
-        else:
-            entry = Games.query.filter_by(id=split[0]).first()
-            db_info[node] = {
-                'Title': entry.title,
-                'Developer': entry.developer,
-                'Year': entry.year,
-                'Cover': entry.cover,
-            }
-    return db_info
-
+from app import app
+from app.models import *
+import Levenshtein
+from rapidfuzz import process
+from rapidfuzz.distance import Indel
+from app.get_info import *
+from app.recommender_index import read_index
+from app.neighbours import stored_neighbours
+from app.sharded_scoring import get_scorer
+from app.node_id import NodeId
+import networkx as nx
+import numpy
+import math
+import heapq
+from app.entities import extract_entities, get_entities
+
+def generate_graph(item_id, item_type, weighting, top_n, index=None):
+    """
+    This function generates a knowledge graph which will be passed to the 'visualise.html' template for rendering by
+    the client using D3.js. This graph consists of nodes (items in the DB) and edges (the similarity score between two items).
+    The nodes are read from the neighbours table when it holds enough neighbours for the item, and are only scored live
+    if a change since the table was last built could have changed them.
+    :param item_id: The ID of the initial node.
+    :param item_type: The type of the initial node.
+    :param weighting: The weighting specified by the user.
+    :param top_n: The size of the graph specified by the user.
+    :param index: The recommender index, if the caller already holds it with read_index.
+    :return graph: The networkx graph object, with a NodeId for each node.
+    """
+    if index is None:
+        with read_index() as index:
+            return generate_graph(item_id, item_type, weighting, top_n, index)
+    graph = nx.Graph()
+    weighting = float(weighting) / 10
+
+    #Use the NodeId instances held by the index, so every graph shares one instance per item.
+    initial = index.keys[index.rows[int(item_id), item_type]]
+    graph.add_node(initial)
+    top_nodes = stored_neighbours(index, item_id, item_type, weighting, int(top_n))
+    if top_nodes is None:
+        top_nodes = list(calculate_recommender(item_id, item_type, weighting, int(top_n), index=index).items())
+    rows = [index.rows[k] for k, v in top_nodes]
+    top_node_ids = [index.keys[row] for row in rows]
+
+    graph.add_nodes_from(top_node_ids)
+
+    #Score every pair of nodes at once. The scores are symmetric, so each pair only needs to be checked once.
+    edge_scores = pairwise_similarity(index, rows)
+    for i, node1 in enumerate(top_node_ids):
+        for j in range(i + 1, len(top_node_ids)):
+            similarity = float(edge_scores[i, j])
+            if similarity >= float(weighting) * 10:
+                graph.add_edge(node1, top_node_ids[j], weight=round(similarity))
+    return graph
+
+
+def calculate_recommender(item_id, item_type, weighting, top_n=None, approximate=None, index=None):
+    """
+    This function creates a list of items that will form part of the knowledge graph. Candidate items are found using
+    the recommender index: the items which share a tag with the initial node, plus any items which share no tags but
+    could still reach the threshold from their title and entities alone. The tag similarity of each candidate is
+    combined with its title and entity similarity, and the item is appended to related should the weighting of the item
+    exceed the threshold specified by the user.
+
+    If top_n is given, only the top_n highest scoring items are kept. Items are scored in descending order of the best
+    score their tag similarity allows, and scoring stops as soon as no remaining item could beat the current top_n.
+
+    In approximate mode the items sharing a tag are found with the TagLSH index rather than the inverted tag index, so
+    some of them may be missed, but every item returned has the same score as in the exact mode.
+
+    If RECOMMENDER_WORKERS is set, the exact mode scores the catalogue across that many worker processes instead, which
+    returns the same items and scores.
+    :param item_id: The ID of the initial node.
+    :param item_type: The type of the initial node.
+    :param weighting: The weighting threshold specified by the user.
+    :param top_n: The number of items to keep, or None to keep every item above the threshold.
+    :param approximate: Whether to use approximate mode, or None to use the RECOMMENDER_ANN setting.
+    :param index: The recommender index, if the caller already holds it with read_index.
+    :return related: A dictionary of nodes to be added to the knowledge graph. When top_n is given, the nodes are ordered
+    from the highest score to the lowest.
+    """
+
+    if index is None:
+        with read_index() as index:
+            return calculate_recommender(item_id, item_type, weighting, top_n, approximate, index)
+
+    #Get the initial node and the items which share at least one tag with it from the inverted tag index.
+    initial_row = index.rows[int(item_id), item_type]
+    threshold = float(weighting)
+    if approximate is None:
+        approximate = app.config['RECOMMENDER_ANN']
+    if not approximate and app.config['RECOMMENDER_WORKERS'] > 0:
+        scores = get_scorer(index).scores(initial_row, threshold, top_n)
+        if top_n is None:
+            return {index.keys[-row]: similarity for similarity, row in sorted(scores, key=lambda score: -score[1])}
+        return {index.keys[-row]: similarity for similarity, row in scores}
+    if approximate:
+        rows, tags_similarities = index.approximate_tag_candidates(initial_row)
+    else:
+        rows, tags_similarities = index.tag_candidates(initial_row)
+
+    if top_n is None:
+        #Add the items which share no tags but could still reach the threshold, and score them in catalogue order.
+        other_rows, other_similarities = side_candidates(index, initial_row, rows, threshold, approximate)
+        rows = numpy.concatenate((rows, other_rows))
+        tags_similarities = numpy.concatenate((tags_similarities, other_similarities))
+        order = numpy.argsort(rows, kind='stable')
+        rows, tags_similarities = rows[order], tags_similarities[order]
+        scores = score_rows(index, initial_row, rows, tags_similarities)
+        return {index.keys[row]: similarity for row, similarity in zip(rows.tolist(), scores) if similarity >= threshold}
+
+    #Keep the top_n items in a heap ordered by score and then by earliest row, so the worst item is always at the top.
+    #Items sharing a tag are scored first, so the items sharing no tags only need to be found if they could still beat
+    #the worst item in the heap.
+    heap = []
+    push_top_n(heap, top_n, threshold, index, initial_row, rows, tags_similarities)
+    floor = max(threshold, heap[0][0]) if len(heap) == top_n else threshold
+    other_rows, other_similarities = side_candidates(index, initial_row, rows, floor, approximate)
+    push_top_n(heap, top_n, threshold, index, initial_row, other_rows, other_similarities)
+    return {index.keys[-row]: similarity for similarity, row in sorted(heap, reverse=True)}
+
+
+def side_candidates(index, initial_row, tagged_rows, floor, approximate=False):
+    """
+    Finds the items which share no tags with the initial node but could still reach a score of floor. The tag similarity
+    of these items is 0, or NaN if either item has no tags, so at most 4 out of 10 can come from their title and
+    entities. The candidates are the items sharing an entity with the initial node, plus the items whose title is close
+    enough in length to reach the floor from the title alone.
+
+    In approximate mode some items which share a tag may not have been found, so the tag similarity of each candidate
+    is calculated rather than assumed to be 0.
+    :param index: The RecommenderIndex.
+    :param initial_row: The row of the initial node.
+    :param tagged_rows: The rows which share a tag with the initial node, which are excluded.
+    :param floor: The score the items must be able to reach.
+    :param approximate: Whether the tagged rows were found in approximate mode.
+    :return: A tuple of two numpy arrays: the rows in ascending order and their tag similarity to the initial node.
+    """
+    #Every item can reach a score of 0, so every item is a candidate.
+    if floor <= 0:
+        rows = numpy.setdiff1d(numpy.arange(len(index.keys)), tagged_rows, assume_unique=True)
+        if approximate:
+            return rows, index.tag_similarities(initial_row, rows)
+        tagged = (index.norms[rows] > 0) & (index.norms[initial_row] > 0)
+        return rows, numpy.where(tagged, 0.0, numpy.nan)
+
+    #An item without tags always scores 0, and the title and entities alone can score at most 4.05 once rounded.
+    if index.norms[initial_row] == 0 or floor > 4.051:
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0)
+
+    #Without a shared entity the title has to reach the floor alone, which needs a Levenshtein ratio of (floor - 0.051) / 3.
+    initial_entities = index.catalogue_entities()[initial_row]
+    rows = numpy.union1d(index.entity_rows(initial_entities), index.title_length_rows(initial_row, (floor - 0.051) / 3))
+    rows = numpy.setdiff1d(rows[index.norms[rows] > 0], tagged_rows, assume_unique=True)
+    if approximate:
+        return rows, index.tag_similarities(initial_row, rows)
+    return rows, numpy.zeros(len(rows))
+
+
+def push_top_n(heap, top_n, threshold, index, initial_row, rows, tags_similarities):
+    """
+    Scores a set of candidate items and pushes them onto a heap holding the top_n items found so far. Candidates are
+    scored in blocks, starting with the best score their tag similarity allows, and any candidates which can no longer
+    beat the worst item in the heap are pruned before their titles and entities are compared.
+    :param heap: The heap of (score, -row) tuples, which is updated in place.
+    :param top_n: The number of items to keep.
+    :param threshold: The weighting threshold specified by the user.
+    :param index: The RecommenderIndex.
+    :param initial_row: The row of the initial node.
+    :param rows: A numpy array of the candidate rows.
+    :param tags_similarities: The tag similarity between the initial node and each candidate row.
+    """
+    #The best score each item could reach, assuming its title and entities match perfectly. The extra 0.051 allows for
+    #the final score being rounded up. An item without tags always scores 0.
+    best = numpy.where(numpy.isnan(tags_similarities), 0, (tags_similarities * 0.6 + 0.4) * 10 + 0.051)
+    keep = best >= threshold
+    rows, tags_similarities, best = rows[keep], tags_similarities[keep], best[keep]
+
+    block_size = 64
+    while len(rows) > 0:
+        if len(heap) == top_n:
+            #Prune any candidates which can no longer beat the worst item in the heap.
+            keep = best >= heap[0][0]
+            rows, tags_similarities, best = rows[keep], tags_similarities[keep], best[keep]
+            if len(rows) == 0:
+                break
+
+        #Take the next block of candidates with the best possible scores, without sorting the rest.
+        if len(rows) > block_size:
+            split = numpy.argpartition(-best, block_size)
+            block, rest = split[:block_size], split[block_size:]
+        else:
+            block, rest = numpy.arange(len(rows)), numpy.zeros(0, dtype=numpy.int64)
+        block_size *= 2
+
+        scores = score_rows(index, initial_row, rows[block], tags_similarities[block])
+        for row, similarity in zip(rows[block].tolist(), scores):
+            if similarity < threshold:
+                continue
+            if len(heap) < top_n:
+                heapq.heappush(heap, (similarity, -row))
+            elif (similarity, -row) > heap[0]:
+                heapq.heapreplace(heap, (similarity, -row))
+        rows, tags_similarities, best = rows[rest], tags_similarities[rest], best[rest]
+
+
+def score_rows(index, initial_row, rows, tags_similarities):
+    """
+    Calculates the similarity score between the initial node and a set of rows of the recommender index, using the tag
+    similarities already calculated for the initial node.
+    :param index: The RecommenderIndex.
+    :param initial_row: The row of the initial node.
+    :param rows: A numpy array of the rows to score.
+    :param tags_similarities: The tag similarity between the initial node and each row.
+    :return: A list of similarity scores, in the same order as rows.
+    """
+    catalogue_entities = index.catalogue_entities()
+    initial_entities = catalogue_entities[initial_row]
+    title_similarities = titles_similarity([index.titles[initial_row]], [index.titles[row] for row in rows])[0]
+    return [combine_scores(float(title_similarity), float(tags_similarity),
+                           float(entities_similarity(initial_entities, catalogue_entities[row])))
+            for row, title_similarity, tags_similarity in zip(rows.tolist(), title_similarities, tags_similarities)]
+
+
+def calculate_similarity(title1, title2, tags1, tags2):
+    """
+    Calculates the similarity between two nodes in the networkx graph. This is used to determine the strength of the
+    similarity between the two nodes.
+    :param title1: The title of the first node.
+    :param title2: The title of the second node.
+    :param tags1: The tags of the first node.
+    :param tags2: The tags of the second node.
+    :return: 0 if no similarity is detected or one of the items is incomplete, otherwise a value between 0 and 1 which is
+    the similarity score. A higher value indicates a stronger similarity.
+    """
+
+    #Extract entities associated with the two titles.
+    entities_title1 = extract_entities(title1)
+    entities_title2 = extract_entities(title2)
+
+    #Calcualte title similarity, cosine similarity and entity similarity.
+    title_similarity = float(title_sum(title1, title2))
+    tags_similarity = float(cosine_similarity(tags1, tags2))
+    entity_similarity = float(entities_similarity(entities_title1, entities_title2))
+
+    return combine_scores(title_similarity, tags_similarity, entity_similarity)
+
+
+def combine_scores(title_similarity, tags_similarity, entity_similarity):
+    """
+    Combines the title, tag and entity similarities of two items into the final similarity score out of 10.
+    :param title_similarity: The Levenshtein ratio of the two titles.
+    :param tags_similarity: The cosine similarity of the two sets of tags.
+    :param entity_similarity: The ratio of entities shared by the two titles.
+    :return: The similarity score, or 0 if one of the items is incomplete.
+    """
+    score = round(float((title_similarity * 0.3) +(tags_similarity * 0.6) + (entity_similarity * 0.1)), 2) * 10
+    return 0 if math.isnan(score) else score
+
+
+def pairwise_similarity(index, rows):
+    """
+    Calculates the similarity between every pair of items in a set of rows of the recommender index. This gives the same
+    scores as compare_nodes, but uses the tags, titles and entities already held by the index rather than querying the
+    database for each pair.
+    :param index: The RecommenderIndex.
+    :param rows: A list of rows of the index.
+    :return: A symmetric numpy array of shape (len(rows), len(rows)) containing the similarity score of each pair.
+    """
+    tags_similarities = index.tag_similarity_block(rows)
+    title_similarities = titles_similarity([index.titles[row] for row in rows], [index.titles[row] for row in rows])
+    entities = [index.catalogue_entities()[row] for row in rows]
+
+    scores = numpy.zeros((len(rows), len(rows)))
+    for i in range(len(rows)):
+        for j in range(i + 1, len(rows)):
+            scores[i, j] = scores[j, i] = combine_scores(float(title_similarities[i, j]),
+                                                         float(tags_similarities[i, j]),
+                                                         float(entities_similarity(entities[i], entities[j])))
+    return scores
+
+
+def compare_nodes(node1, node2):
+    """
+    Compares the similarity of two nodes in the graph by gathering the required parts used to calculate similarity.
+    Then passes this to the calculate similarity function to generate a similarity score which is returned to the
+    user.
+    :param node1: The first node of the graph, as a NodeId or an "id type" string.
+    :param node2: The second node of the graph, as a NodeId or an "id type" string.
+    :return: Returns the value of the calculate_similarity function when applied to the two nodes.
+    """
+    # Extract IDs and types from the nodes
+    id1, type1 = NodeId.parse(node1)
+    id2, type2 = NodeId.parse(node2)
+
+    # Get the items from the item cache and their tags
+    items = get_items([(id1, type1), (id2, type2)])
+    item1 = items[id1, type1]
+    item2 = items[id2, type2]
+    tags1 = get_item_tags(id1, type1)
+    tags2 = get_item_tags(id2, type2)
+
+    # Get the entities of both titles from the entity cache.
+    entities1 = get_entities(id1, type1, item1.title)
+    entities2 = get_entities(id2, type2, item2.title)
+
+    # Calculate similarity using the same logic as calculate_similarity
+    return combine_scores(float(title_sum(item1.title, item2.title)), float(cosine_similarity(tags1, tags2)),
+                          float(entities_similarity(entities1, entities2)))
+
+
+def cosine_similarity(initial_tags, other_tags):
+    """
+    Calculates the cosine similarity between two sets of tags.
+    This is the dot product of the two sets of tags divided by the magnitude of them both.
+
+    :param initial_tags: The tags for the first item.
+    :param other_tags: The tags for the second item.
+    :return cs: The cosine similarity number
+    """
+    all_tags = set.union(set(initial_tags.keys()), set(other_tags.keys()))
+
+    #Get the tags vectors to perform the dot product on, set by default to 0 if the tag is not present in one of the items.
+    initial_tags_vector = [initial_tags.get(tag, 0) for tag in all_tags]
+    other_tags_vector = [other_tags.get(tag, 0) for tag in all_tags]
+
+    #Use numpy to perform the dot product calculation
+    dot_product = numpy.dot(initial_tags_vector, other_tags_vector)
+
+    #Calculate the magnitudes of the two vectors of tags using numpy.
+    initial_magnitude = numpy.sqrt(numpy.dot(initial_tags_vector, initial_tags_vector))
+    other_magnitude = numpy.sqrt(numpy.dot(other_tags_vector, other_tags_vector))
+
+    #Calculate the cosine similarity
+    cs = dot_product / (initial_magnitude * other_magnitude)
+
+    return cs
+
+def title_sum(item1_title, item2_title):
+    """
+    Calculates the Levenshtein similarity between two titles. This works by calculating the number of character changes
+    required to translate one title into another title. This is implemented using the Levenshtein Python module.
+    :param item1_title: The first title string.
+    :param item2_title: The second title string.
+    :return: The Levenshtein ratio number.
+    """
+    return Levenshtein.ratio(item1_title, item2_title)
+
+def titles_similarity(titles1, titles2):
+    """
+    Calculates the Levenshtein similarity between every title in one list and every title in another list. This gives
+    the same values as title_sum, but scores all of the pairs in a single multi-threaded call to rapidfuzz rather than one
+    call per pair.
+    :param titles1: The first list of titles.
+    :param titles2: The second list of titles.
+    :return: A numpy array of shape (len(titles1), len(titles2)) containing the Levenshtein ratio of each pair of titles.
+    """
+    return process.cdist(titles1, titles2, scorer=Indel.normalized_similarity, dtype=numpy.float64, workers=-1)
+
+def entities_similarity(entities1, entities2):
+    """
+    Uses the spacy model to calculate the entity similarity. This is done by comparing the common entities to total entities
+    to produce a ratio of entities in common between two items ranging from 0-1 . A higher value indicates stronger similarity
+    between the two entities.
+    :param entities1: A list of entities from the first item.
+    :param entities2: A list of entities for the second item.
+    :return: The ratio of common entities shared by both items.
+    """
+    common_entities = set(entities1.keys()).intersection(set(entities2.keys()))
+    total_entities = len(entities1) + len(entities2)
+
+    #Make sure to return 0 if no entities are identified.
+    if total_entities == 0:
+        return 0
+    return len(common_entities) / (total_entities - len(common_entities))
+
+#Prepare the graph to be JSONified.
+def serialise_graph(graph):
+    """
+    This function serialises the graph in a format that can then be converted to JSON for rendering by D3.js on the front-end.
+    This is where each NodeId is converted into the "id type" string used by the front end.
+    :param graph: The Graph object created by networkx.
+    :return: The nodes and edges of the graph in a JSON format.
+    """
+    nodes = [{"id": str(node)} for node in graph.nodes()]
+    links = []
+    for u, v, data in graph.edges(data=True):
+        links.append({
+            "source": str(u),
+            "target": str(v),
+            "weight": data.get("weight")
+        })
+    return {
+        "nodes": nodes,
+        "links": links
+    }
+
+
+def database_info(nodes):
+    """
+    Generates the database info to be passed to the front end in JSON. This information is then used to provide information
+    about the items in the knowledge graph visualisation. The items are read from the item cache, which loads any items
+    it does not hold with one query per item type.
+    :param nodes: The nodes of the knowledge graph, as NodeIds or "id type" strings.
+    :return db_info: A dictionary containing the "id type" string of the node as a key and database info as the value.
+    """
+    db_info = {}
+
+    #Load all of the items together.
+    keys = [NodeId.parse(node) for node in nodes]
+    entries = get_items(keys)
+    for key in keys:
+        entry = entries.get(key)
+        if entry is None:
+            continue
+        node = str(key)
+        if key.type == "book":
+            db_info[node] = {
+                'Title': entry.title,
+                'Author': entry.author,
+                'Year': entry.year,
+                'Publisher': entry.publisher,
+                'Cover': entry.cover,
+            }
+        elif key.type == "film":
+            db_info[node] = {
+                'Title': entry.title,
+                'Director': entry.director,
+                'Year': entry.year,
+                'Production Company': entry.production_company,
+                'Cover': entry.cover,
+            }
+        else:
+            db_info[node] = {
+                'Title': entry.title,
+                'Developer': entry.developer,
+                'Year': entry.year,
+                'Cover': entry.cover,
+            }
+    return db_info
+
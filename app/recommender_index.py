@@ -0,0 +1,592 @@
+from app import app
+from app.models import *
+from app.ann import TagLSH
+from app.node_id import NodeId
+from app.entities import get_catalogue_entities, get_entities
+from app.feature_store import StoredStrings, StoredEntities, ChangedSequence, current_feature_store, \
+    open_feature_store
+from app.search_index import ITEM_TYPES
+from sqlalchemy.exc import OperationalError
+from contextlib import contextmanager
+import bisect
+import threading
+import numpy
+
+
+class ReadWriteLock:
+    """
+    A lock which can be held by any number of readers at once, or by a single writer. A writer waiting for the lock
+    stops any more readers taking it, so changes are not held up by a steady stream of requests.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writing = False
+        self.waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        """
+        Holds the lock as a reader until the block ends.
+        """
+        with self.condition:
+            while self.writing or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if self.readers == 0:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        """
+        Holds the lock as the only writer until the block ends.
+        """
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writing or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writing = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+
+class RecommenderIndex:
+    """
+    An in-memory index of every item in the Books, Films and Games tables used by the recommender. The tag counts held in
+    the ItemTags table are stored as a sparse item x tag matrix in CSR (compressed sparse row) form, together with the L2
+    norm of every row. The same counts are also stored by column, as an inverted index from each tag to the items which
+    have it, so the items sharing a tag with the initial node can be found and scored without visiting the rest of the
+    catalogue. Two cheaper side indexes, the lengths of the titles and an inverted index of title entities, are used to
+    find the items which share no tags but could still score highly enough from their title and entities alone.
+
+    The CSR and inverted index arrays built from the database are not modified. Changes made after the index was built
+    are read from the IndexChanges table and applied as deltas: the current tags of every changed row are held in an
+    overlay which takes the place of the row's stored values, and that row's norm is recalculated in place.
+
+    The index is shared by every request thread of a process. Changes are applied while holding the write side of its
+    lock, and requests score items while holding the read side, see read_index, so a request never sees a change half
+    applied.
+
+    The index can also be loaded from the feature store, see app/feature_store.py, in which case the arrays are memory
+    maps shared by every process and the changes made since the store was saved are applied in the same way.
+    """
+
+    def __init__(self, keys, titles, indptr, indices, counts, tag_columns, version=0, arrays=None, entities=None):
+        """
+        :param keys: A list of NodeIds, one per row of the matrix.
+        :param titles: A list of the item titles, in the same order as keys.
+        :param indptr: The CSR row pointer array. The tags of row i are stored in indices[indptr[i]:indptr[i + 1]].
+        :param indices: The CSR column index array.
+        :param counts: The CSR data array containing the ItemTags counts.
+        :param tag_columns: A dictionary mapping a tag_id to its column in the matrix.
+        :param version: The seq of the last IndexChanges entry included in the arrays.
+        :param arrays: The norms, inverted tag index, title lengths side index and entity postings saved by the feature
+        store, or None to calculate them.
+        :param entities: The entities of every row, or None to load them from the entity cache when first needed.
+        """
+        self.keys = keys
+        self.titles = titles
+        self.rows = {key: row for row, key in enumerate(keys)}
+        self.indptr = indptr
+        self.indices = indices
+        self.counts = counts
+        self.tag_columns = tag_columns
+        self.version = version
+        self.entities = entities
+        self.entity_postings = None
+        self.lsh = None
+        self.lock = ReadWriteLock()
+
+        #The current entities of the rows added or renamed since the entity postings were made.
+        self.entity_overlay = {}
+
+        #The number of rows and columns held in the stored arrays. Rows and columns added later only exist in the overlay.
+        self.stored_rows = len(keys)
+        self.stored_columns = len(tag_columns)
+
+        #The overlay of changed rows. overlay maps a row to all of its current tags as {column: count}, and
+        #overlay_postings maps a column to the set of overlay rows which have it.
+        self.overlay = {}
+        self.overlay_postings = {}
+        self.overlay_rows = numpy.zeros(0, dtype=numpy.int64)
+
+        #Rows added or renamed since the index was built. These are not in the title lengths side index.
+        self.unsorted_rows = []
+
+        if arrays is not None:
+            self.norms = arrays['norms']
+            self.postings_ptr = arrays['postings_ptr']
+            self.postings_rows = arrays['postings_rows']
+            self.postings_counts = arrays['postings_counts']
+            self.rows_by_length = arrays['rows_by_length']
+            self.sorted_lengths = arrays['sorted_lengths']
+            self.entity_postings = arrays['entity_postings']
+            return
+
+        #The L2 norm of each row. Rows are normalised by this when scoring, so the product of two rows is their cosine.
+        value_rows = numpy.repeat(numpy.arange(len(keys)), numpy.diff(indptr))
+        self.norms = numpy.sqrt(numpy.bincount(value_rows, weights=counts * counts, minlength=len(keys)))
+
+        #The inverted tag index. The rows which have the tag in column c are stored in postings_rows[postings_ptr[c]:
+        #postings_ptr[c + 1]], in ascending order, with their counts in postings_counts.
+        order = numpy.argsort(indices, kind='stable')
+        self.postings_ptr = numpy.zeros(len(tag_columns) + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(indices, minlength=len(tag_columns)), out=self.postings_ptr[1:])
+        self.postings_rows = value_rows[order]
+        self.postings_counts = counts[order]
+
+        #The title lengths side index. Rows are sorted by the length of their title so the rows whose title is close
+        #enough in length to reach a given Levenshtein ratio can be found with a binary search.
+        title_lengths = numpy.array([len(title) for title in titles], dtype=numpy.int64)
+        self.rows_by_length = numpy.argsort(title_lengths, kind='stable')
+        self.sorted_lengths = title_lengths[self.rows_by_length]
+
+    @classmethod
+    def build(cls):
+        """
+        Builds the index from the database using five queries: one for the latest change, one for each item table and
+        one for the whole of ItemTags. Items are ordered books, films then games, matching the order
+        calculate_recommender has always visited them in.
+        :return: The new RecommenderIndex.
+        """
+        #Read the version first. Any change made while the tables are being read is applied again by catch_up, which
+        #is harmless because every change records the absolute count.
+        version = db.session.query(db.func.max(IndexChanges.seq)).scalar() or 0
+
+        keys = []
+        titles = []
+        for model, item_type in ((Books, "book"), (Films, "film"), (Games, "game")):
+            for item_id, title in db.session.query(model.id, model.title).order_by(model.id):
+                keys.append(NodeId(item_id, item_type))
+                titles.append(title)
+        rows = {key: row for row, key in enumerate(keys)}
+
+        #Collect the (row, column, count) triples for every item tag, skipping any that belong to a missing item.
+        tag_columns = {}
+        triples = []
+        for item_id, item_type, tag_id, count in db.session.query(ItemTags.item_id, ItemTags.item_type,
+                                                                 ItemTags.tag_id, ItemTags.count):
+            row = rows.get((item_id, item_type))
+            if row is None:
+                continue
+            column = tag_columns.setdefault(tag_id, len(tag_columns))
+            triples.append((row, column, count))
+
+        #Sort the triples by row and then column to lay them out in CSR order.
+        triples = numpy.array(triples, dtype=numpy.int64).reshape(-1, 3)
+        triples = triples[numpy.lexsort((triples[:, 1], triples[:, 0]))]
+        indptr = numpy.zeros(len(keys) + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(triples[:, 0], minlength=len(keys)), out=indptr[1:])
+        return cls(keys, titles, indptr, triples[:, 1].copy(), triples[:, 2].astype(numpy.float64), tag_columns,
+                   version)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads the index from a version of the feature store without reading the database. The arrays are memory maps, so
+        only the keys, the row lookup and the tag columns are built in memory.
+        :param path: The directory of the version.
+        :return: The new RecommenderIndex.
+        """
+        meta, arrays = open_feature_store(path)
+        keys = [NodeId(item_id, ITEM_TYPES[item_type])
+                for item_id, item_type in zip(arrays['item_ids'].tolist(), arrays['item_types'].tolist())]
+        titles = ChangedSequence(StoredStrings(arrays['title_offsets'], arrays['title_bytes']))
+        tag_columns = {tag_id: column for column, tag_id in enumerate(arrays['tag_ids'].tolist())}
+        texts = StoredStrings(arrays['entity_text_offsets'], arrays['entity_text_bytes'])
+        entities = ChangedSequence(StoredEntities(arrays['entity_ptr'], arrays['entity_text_ids'],
+                                                  arrays['entity_label_ids'], texts, meta['labels']))
+        arrays['entity_postings'] = (texts, arrays['entity_postings_ptr'], arrays['entity_postings_rows'])
+        return cls(keys, titles, arrays['indptr'], arrays['indices'], arrays['counts'], tag_columns, meta['version'],
+                   arrays, entities)
+
+    def row_tags(self, row):
+        """
+        Gets the current tags of a single row of the matrix, taking the overlay into account.
+        :param row: The row of the item.
+        :return: A dictionary with the column as the key and the tag count as the value.
+        """
+        if row in self.overlay:
+            return self.overlay[row]
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return dict(zip(self.indices[start:end].tolist(), self.counts[start:end].tolist()))
+
+    def catalogue_entities(self):
+        """
+        Gets the entities of every title in the index from the entity cache, loading them the first time they are needed.
+        :return: A list of entity dictionaries, one per row.
+        """
+        if self.entities is None:
+            self.entities = get_catalogue_entities(self.keys, self.titles)
+        return self.entities
+
+    def build_entity_postings(self):
+        """
+        Builds the inverted index from each entity to the rows which have it, the first time it is needed. The texts of
+        the entities are sorted, and the rows which have the entity texts[i] are stored in rows[ptr[i]:ptr[i + 1]], in
+        ascending order.
+        :return: A tuple of the sorted texts, the ptr array and the rows array.
+        """
+        if self.entity_postings is None:
+            pairs = sorted((text, row) for row, row_entities in enumerate(self.catalogue_entities())
+                           for text in row_entities)
+            texts = sorted({text for text, row in pairs})
+            positions = {text: position for position, text in enumerate(texts)}
+            ptr = numpy.zeros(len(texts) + 1, dtype=numpy.int64)
+            numpy.cumsum(numpy.bincount(numpy.array([positions[text] for text, row in pairs], dtype=numpy.int64),
+                                        minlength=len(texts)), out=ptr[1:])
+            self.entity_postings = (texts, ptr, numpy.array([row for text, row in pairs], dtype=numpy.int64))
+        return self.entity_postings
+
+    def entity_rows(self, entities):
+        """
+        Finds the rows whose title shares at least one entity with the given entities, using an inverted index from each
+        entity to the rows which have it. The rows added or renamed since the inverted index was built are matched
+        against their current entities instead.
+        :param entities: A dictionary of entities in the same format as extract_entities.
+        :return: A numpy array of rows, in ascending order.
+        """
+        texts, ptr, posting_rows = self.build_entity_postings()
+        found = []
+        for text in entities:
+            position = bisect.bisect_left(texts, text)
+            if position < len(texts) and texts[position] == text:
+                found.append(posting_rows[ptr[position]:ptr[position + 1]])
+        rows = numpy.unique(numpy.concatenate(found + [numpy.zeros(0, dtype=numpy.int64)]))
+        if self.entity_overlay:
+            changed = numpy.fromiter(self.entity_overlay, dtype=numpy.int64)
+            matched = [row for row, row_entities in self.entity_overlay.items()
+                       if any(text in row_entities for text in entities)]
+            rows = numpy.union1d(rows[~numpy.isin(rows, changed)], numpy.array(matched, dtype=numpy.int64))
+        return rows
+
+    def title_length_rows(self, row, ratio):
+        """
+        Finds the rows whose title is close enough in length to the title of the given row to reach a Levenshtein ratio.
+        The ratio of two titles of length a and b can be at most 2 * min(a, b) / (a + b), so only the rows with a title
+        length between ratio * a / (2 - ratio) and a * (2 - ratio) / ratio need to be compared. Rows added or renamed
+        since the index was built are always included.
+        :param row: The row of the item being compared against the catalogue.
+        :param ratio: The Levenshtein ratio the titles must be able to reach.
+        :return: A numpy array of rows, in ascending order.
+        """
+        if ratio <= 0:
+            return numpy.arange(len(self.keys))
+
+        #Widen the bounds slightly so rounding can never exclude a row which reaches the ratio exactly.
+        length = len(self.titles[row])
+        ratio = min(ratio, 1.0) - 1e-9
+        shortest = numpy.searchsorted(self.sorted_lengths, ratio * length / (2 - ratio), side='left')
+        longest = numpy.searchsorted(self.sorted_lengths, length * (2 - ratio) / ratio, side='right')
+        return numpy.union1d(self.rows_by_length[shortest:longest], numpy.array(self.unsorted_rows, dtype=numpy.int64))
+
+    def tag_candidates(self, row):
+        """
+        Finds every row which shares at least one tag with the given row using the inverted tag index, and calculates the
+        cosine similarity of their tags. The cost of this grows with the number of items sharing a tag with the row,
+        rather than with the size of the catalogue. Every other tagged row has a cosine similarity of 0.
+        :param row: The row of the item being compared against the catalogue.
+        :return: A tuple of two numpy arrays: the rows in ascending order and their cosine similarity to the given row.
+        """
+        query = self.row_tags(row)
+        columns = numpy.array([column for column in query if column < self.stored_columns], dtype=numpy.int64)
+        query_counts = numpy.array([query[column] for column in columns.tolist()], dtype=numpy.float64)
+
+        #Gather the stored postings of every tag the row has, and multiply each stored count by the count in the query.
+        lengths = self.postings_ptr[columns + 1] - self.postings_ptr[columns]
+        positions = numpy.concatenate([numpy.arange(self.postings_ptr[column], self.postings_ptr[column + 1])
+                                       for column in columns] + [numpy.zeros(0, dtype=numpy.int64)])
+        rows = self.postings_rows[positions]
+        products = self.postings_counts[positions] * numpy.repeat(query_counts, lengths)
+
+        #The stored values of overlay rows are out of date, so replace them with the products from the overlay.
+        if len(self.overlay) > 0:
+            current = ~numpy.isin(rows, self.overlay_rows)
+            overlay_rows = sorted(set().union(*[self.overlay_postings.get(column, ()) for column in query]))
+            overlay_products = [sum(count * self.overlay[overlay_row].get(column, 0) for column, count in query.items())
+                                for overlay_row in overlay_rows]
+            rows = numpy.concatenate((rows[current], numpy.array(overlay_rows, dtype=numpy.int64)))
+            products = numpy.concatenate((products[current], numpy.array(overlay_products, dtype=numpy.float64)))
+
+        #The counts are whole numbers, so summing the products gives exactly the dot products cosine_similarity produces.
+        rows, inverse = numpy.unique(rows, return_inverse=True)
+        dots = numpy.bincount(inverse, weights=products, minlength=len(rows))
+        return rows, dots / (self.norms[row] * self.norms[rows])
+
+    def approximate_tag_candidates(self, row):
+        """
+        Finds the rows which are likely to share tags with the given row using the TagLSH index, which is built the
+        first time it is needed, and calculates the exact cosine similarity of their tags. Unlike tag_candidates, the
+        cost of this does not grow with the length of the postings of popular tags, but some rows sharing a tag may be
+        missed. Overlay rows are hashed from out of date values, so those sharing a tag are always included.
+        :param row: The row of the item being compared against the catalogue.
+        :return: A tuple of two numpy arrays: the rows in ascending order and their cosine similarity to the given row.
+        """
+        if self.lsh is None:
+            self.lsh = TagLSH(self, app.config['RECOMMENDER_ANN_TABLES'], app.config['RECOMMENDER_ANN_BITS'],
+                              app.config['RECOMMENDER_ANN_PROBES'])
+        query = self.row_tags(row)
+        rows = self.lsh.query(query)
+        overlay_rows = set().union(*[self.overlay_postings.get(column, ()) for column in query])
+        rows = numpy.union1d(rows[~numpy.isin(rows, self.overlay_rows)],
+                             numpy.array(sorted(overlay_rows), dtype=numpy.int64))
+
+        #Rows which only collided in a bucket share no tags, so they are left for side_candidates to consider.
+        similarities = self.tag_similarities(row, rows)
+        keep = similarities > 0
+        return rows[keep], similarities[keep]
+
+    def tag_similarities(self, row, rows):
+        """
+        Calculates the exact cosine similarity between the tags of one row and the tags of a set of other rows, by
+        gathering the stored values of the other rows and matching their columns against the columns of the given row.
+        :param row: The row of the item being compared.
+        :param rows: A numpy array of rows.
+        :return: A numpy array of the cosine similarity of each row, which is NaN if either row has no tags.
+        """
+        query = self.row_tags(row)
+        dots = numpy.zeros(len(rows))
+        stored = ~numpy.isin(rows, self.overlay_rows) & (rows < self.stored_rows)
+
+        if query:
+            columns = numpy.array(sorted(query), dtype=numpy.int64)
+            query_counts = numpy.array([query[column] for column in columns.tolist()], dtype=numpy.float64)
+
+            #Gather the positions of the stored values of every row, then find each value's column in the query.
+            stored_rows = rows[stored]
+            lengths = self.indptr[stored_rows + 1] - self.indptr[stored_rows]
+            positions = (numpy.repeat(self.indptr[stored_rows] - (numpy.cumsum(lengths) - lengths), lengths)
+                         + numpy.arange(lengths.sum()))
+            found = numpy.minimum(numpy.searchsorted(columns, self.indices[positions]), len(columns) - 1)
+            products = numpy.where(columns[found] == self.indices[positions],
+                                   self.counts[positions] * query_counts[found], 0.0)
+            dots[stored] = numpy.bincount(numpy.repeat(numpy.arange(len(stored_rows)), lengths), weights=products,
+                                          minlength=len(stored_rows))
+
+            for position in numpy.flatnonzero(~stored).tolist():
+                other = self.overlay.get(int(rows[position]), {})
+                dots[position] = sum(count * other.get(column, 0) for column, count in query.items())
+
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            return dots / (self.norms[row] * self.norms[rows])
+
+    def tag_similarity_block(self, rows):
+        """
+        Calculates the cosine similarity between the tags of every pair in a small set of rows, such as the nodes of a
+        knowledge graph. The rows are gathered into a dense matrix over the tags they use, so all of the pairs are
+        calculated with one matrix product.
+        :param rows: A list of rows.
+        :return: A symmetric numpy array of shape (len(rows), len(rows)) containing the cosine similarity of each pair.
+        """
+        row_tags = [self.row_tags(row) for row in rows]
+        local_columns = {column: position for position, column in enumerate(set().union(*row_tags))}
+        dense = numpy.zeros((len(rows), len(local_columns)))
+        for position, tags in enumerate(row_tags):
+            for column, count in tags.items():
+                dense[position, local_columns[column]] = count
+
+        norms = self.norms[rows]
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            return (dense @ dense.T) / numpy.outer(norms, norms)
+
+    def set_count(self, key, tag_id, count):
+        """
+        Applies a change to one item tag. The row is copied into the overlay if it is not already there, the count is
+        set, and the norm of that row alone is recalculated.
+        :param key: The (id, type) tuple of the item.
+        :param tag_id: The ID of the tag.
+        :param count: The new count of the tag on the item, or 0 if the tag has been removed.
+        """
+        row = self.rows.get(key)
+        if row is None:
+            return
+        column = self.tag_columns.setdefault(tag_id, len(self.tag_columns))
+        if row not in self.overlay:
+            self.overlay[row] = self.row_tags(row)
+            self.overlay_rows = numpy.append(self.overlay_rows, row)
+            for existing_column in self.overlay[row]:
+                self.overlay_postings.setdefault(existing_column, set()).add(row)
+
+        tags = self.overlay[row]
+        if count > 0:
+            tags[column] = float(count)
+            self.overlay_postings.setdefault(column, set()).add(row)
+        else:
+            tags.pop(column, None)
+            self.overlay_postings.get(column, set()).discard(row)
+        self.norms[row] = numpy.sqrt(sum(value * value for value in tags.values()))
+
+    def set_item(self, key, title, entities=None):
+        """
+        Applies the insertion or renaming of an item. A new item is added as a new row of the overlay with no tags.
+        :param key: The (id, type) tuple of the item.
+        :param title: The title of the item.
+        :param entities: The entities of the title, if they have already been loaded.
+        """
+        row = self.rows.get(key)
+        if row is not None and self.titles[row] == title:
+            return
+        if entities is None and self.entities is not None:
+            entities = get_entities(key[0], key[1], title)
+
+        if row is None:
+            #Extend the per-row arrays before publishing the new row, so it is never visible without a norm.
+            row = len(self.keys)
+            self.norms = numpy.append(self.norms, 0.0)
+            self.titles.append(title)
+            self.overlay[row] = {}
+            self.overlay_rows = numpy.append(self.overlay_rows, row)
+            if entities is not None:
+                self.entities.append(entities)
+            key = NodeId.parse(key)
+            self.keys.append(key)
+            self.rows[key] = row
+        else:
+            self.titles[row] = title
+            if entities is not None:
+                self.entities[row] = entities
+        self.unsorted_rows.append(row)
+
+        if self.entity_postings is not None:
+            self.entity_overlay[row] = entities
+
+    def catch_up(self):
+        """
+        Applies every change written to the IndexChanges table since this index was built or last caught up, including
+        those made by other processes, with a single query. The changes and entities are read before the write lock is
+        taken, so requests are only held up while the changes are applied.
+        """
+        changes = IndexChanges.query.filter(IndexChanges.seq > self.version).order_by(IndexChanges.seq).all()
+
+        #Load the entities of every inserted or renamed item together, rather than one item at a time.
+        items = {}
+        entities = {}
+        if self.entities is not None:
+            items = {(change.item_id, change.item_type): change.title for change in changes if change.tag_id is None}
+            entities = dict(zip(items, get_catalogue_entities(list(items), list(items.values()))))
+        with self.lock.write():
+            for change in changes:
+                if change.tag_id is None:
+                    key = (change.item_id, change.item_type)
+                    self.set_item(key, change.title, entities.get(key) if items.get(key) == change.title else None)
+                else:
+                    self.set_count((change.item_id, change.item_type), change.tag_id, change.count)
+                self.version = change.seq
+
+
+_index = None
+_index_store = None
+_index_lock = threading.Lock()
+
+#Once the overlay holds this many rows, or a tenth of the catalogue, the index is rebuilt so the overlay stays small.
+MAX_OVERLAY_ROWS = 10000
+
+
+def get_index():
+    """
+    Gets the recommender index for this process, loading it from the current version of the feature store, or building
+    it from the database if no feature store has been saved, the first time it is needed. The index is loaded again
+    whenever a new version of the feature store is saved. Any changes written since it was last used, by this process
+    or any other, are applied first.
+    :return: The RecommenderIndex.
+    """
+    global _index, _index_store
+    with _index_lock:
+        store = current_feature_store()
+        if _index is None or store != _index_store:
+            _index = RecommenderIndex.load(store) if store is not None else RecommenderIndex.build()
+            _index_store = store
+
+        #A bulk import can write more changes than the overlay is meant to hold, so rebuild rather than apply them. The
+        #index is also rebuilt if changes it has not applied yet have been pruned.
+        first, last = db.session.query(db.func.min(IndexChanges.seq), db.func.max(IndexChanges.seq)).one()
+        limit = max(MAX_OVERLAY_ROWS, _index.stored_rows // 10)
+        if last is not None and last > _index.version and first > _index.version + 1:
+            _index = RecommenderIndex.build()
+        elif len(_index.overlay) > limit or (last or 0) - _index.version > limit:
+            _index = RecommenderIndex.build()
+            prune_changes(_index.version)
+        if last is not None and last > _index.version:
+            _index.catch_up()
+        return _index
+
+
+@contextmanager
+def read_index():
+    """
+    Gets the recommender index with get_index and holds the read side of its lock until the block ends, so no changes
+    are applied to it while it is being used. Code using the index inside the block must not call get_index or
+    read_index again, and should be given the index instead.
+    :return: A context manager giving the RecommenderIndex.
+    """
+    index = get_index()
+    with index.lock.read():
+        yield index
+
+
+def prune_changes(version):
+    """
+    Deletes the IndexChanges entries included in an index which has been rebuilt or saved to the feature store, in a
+    transaction of its own. The entries after the latest complete build of the neighbours table are kept, as
+    stored_neighbours reads them to find items which have changed since the build, and so is the newest entry, so the
+    seq of new entries keeps increasing. A process whose index or graph cache is older than the entries kept rebuilds it
+    rather than catching up. Pruning is skipped if another connection is writing to the database.
+    :param version: The seq of the last IndexChanges entry included in the index.
+    """
+    build = NeighbourBuilds.query.filter_by(complete=True).order_by(NeighbourBuilds.build_id.desc()).first()
+    if build is not None:
+        version = min(version, build.version)
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(IndexChanges.__table__.delete().where(IndexChanges.seq < version))
+    except OperationalError:
+        pass
+
+
+def log_tag_change(item_id, item_type, tag_id, count):
+    """
+    Records a change to the count of a tag on an item, so every process can update its recommender index. The change is
+    added to the session and is committed along with the change to the ItemTags table.
+    :param item_id: The ID of the item.
+    :param item_type: The type of the item.
+    :param tag_id: The ID of the tag.
+    :param count: The new count of the tag on the item, or 0 if the tag has been removed.
+    """
+    db.session.add(IndexChanges(item_id=int(item_id), item_type=item_type, tag_id=int(tag_id), count=count))
+
+
+def log_item_change(item_id, item_type, title):
+    """
+    Records the insertion or renaming of an item, so every process can update its recommender index. The change is
+    added to the session and is committed along with the item.
+    :param item_id: The ID of the item.
+    :param item_type: The type of the item.
+    :param title: The title of the item.
+    """
+    db.session.add(IndexChanges(item_id=int(item_id), item_type=item_type, title=title))
+
+
+def log_items_after(item_type, item_id, max_id):
+    """
+    Records the insertion of every item of a type with an ID above item_id and up to max_id with one statement, such as
+    the items added by a bulk import, so every process can update its recommender index. The caller is responsible for
+    committing.
+    :param item_type: The type of the items.
+    :param item_id: The highest ID of the items already recorded.
+    :param max_id: The highest ID of the items to record.
+    """
+    model = {"book": Books, "film": Films, "game": Games}[item_type]
+    items = db.select(model.id, db.literal(item_type), model.title)\
+        .where(model.id > int(item_id), model.id <= int(max_id)).order_by(model.id)
+    db.session.execute(IndexChanges.__table__.insert().from_select(["item_id", "item_type", "title"], items))
@@ -0,0 +1,163 @@
+from app.models import *
+from sqlalchemy import text
+import re
+
+ITEM_TYPES = ["book", "film", "game"]
+
+#The item tables and the column holding the creator of each item, in the same order as ITEM_TYPES.
+CREATOR_COLUMNS = [("books", "author"), ("films", "director"), ("games", "developer")]
+
+#The weights of the title, creator and tags columns when ranking matches with bm25.
+RANK_WEIGHTS = "0, 0, 10.0, 5.0, 1.0"
+
+#Whether the search_index table has been found, see search_index_exists.
+_search_index_exists = False
+
+
+def search_rowid(item_id, item_type):
+    """
+    Gets the rowid of an item in the search_index table, so an item can be found without scanning the table.
+    :param item_id: The ID of the item.
+    :param item_type: The type of the item.
+    :return: The rowid.
+    """
+    return int(item_id) * len(ITEM_TYPES) + ITEM_TYPES.index(item_type)
+
+
+def tags_sql(item_id_sql):
+    """
+    Builds a subquery which joins the text of every tag on an item into one string. The type of the item is bound to the
+    :item_type parameter of the statement.
+    :param item_id_sql: The fixed SQL expression giving the ID of the item, such as a column or a parameter.
+    :return: The SQL of the subquery.
+    """
+    return (f"(SELECT group_concat(tags.tag, ' ') FROM item_tags JOIN tags ON tags.tag_id = item_tags.tag_id "
+            f"WHERE item_tags.item_type = :item_type AND item_tags.item_id = {item_id_sql})")
+
+
+def search_index_exists():
+    """
+    Checks whether ensure_search_index has created the search_index table. Until it has, searches scan the item tables
+    and items are not added to it, as it is filled with every item when it is created. Once the table has been found it
+    is not looked for again.
+    :return: Whether the table exists.
+    """
+    global _search_index_exists
+    if not _search_index_exists:
+        _search_index_exists = db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'")).first() is not None
+    return _search_index_exists
+
+
+def ensure_search_index():
+    """
+    Creates the search_index FTS5 table if it does not exist, and fills it from the item tables if it is empty. The table
+    holds the title, creator and tags of every item, with prefix indexes so prefix searches do not scan the table.
+    """
+    db.session.execute(text("CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(item_type UNINDEXED, "
+                            "item_id UNINDEXED, title, creator, tags, prefix='2 3')"))
+    if db.session.execute(text("SELECT count(*) FROM search_index")).scalar() == 0:
+        rebuild_search_index()
+    db.session.commit()
+
+
+def rebuild_search_index():
+    """
+    Replaces the contents of the search_index table with the title, creator and tags of every item, using one statement
+    per item type. The caller is responsible for committing.
+    """
+    db.session.execute(text("DELETE FROM search_index"))
+    for item_type, (table, creator) in zip(ITEM_TYPES, CREATOR_COLUMNS):
+        db.session.execute(text(
+            f"INSERT INTO search_index(rowid, item_type, item_id, title, creator, tags) "
+            f"SELECT id * {len(ITEM_TYPES)} + {ITEM_TYPES.index(item_type)}, :item_type, id, title, {creator}, "
+            f"{tags_sql(f'{table}.id')} FROM {table}"), {"item_type": item_type})
+
+
+def index_items_after(item_type, item_id, max_id):
+    """
+    Adds every item of a type with an ID above item_id and up to max_id to the search_index table with one statement,
+    such as the items added by a bulk import. Items which are already in the table, such as items added through the app
+    while the import was running, are replaced. The caller is responsible for committing.
+    :param item_type: The type of the items.
+    :param item_id: The highest ID of the items already indexed.
+    :param max_id: The highest ID of the items to index.
+    """
+    table, creator = CREATOR_COLUMNS[ITEM_TYPES.index(item_type)]
+    db.session.execute(text(
+        f"INSERT OR REPLACE INTO search_index(rowid, item_type, item_id, title, creator, tags) "
+        f"SELECT id * {len(ITEM_TYPES)} + {ITEM_TYPES.index(item_type)}, :item_type, id, title, {creator}, "
+        f"{tags_sql(f'{table}.id')} FROM {table} WHERE id > :item_id AND id <= :max_id"),
+        {"item_type": item_type, "item_id": int(item_id), "max_id": int(max_id)})
+
+
+def index_item(item_id, item_type, title, creator):
+    """
+    Adds an item to the search_index table, or replaces it if it is already there. The caller is responsible for
+    committing, so the item and its search entry are written together.
+    :param item_id: The ID of the item.
+    :param item_type: The type of the item.
+    :param title: The title of the item.
+    :param creator: The author, director or developer of the item.
+    """
+    if not search_index_exists():
+        return
+    db.session.flush()
+    rowid = search_rowid(item_id, item_type)
+    db.session.execute(text("DELETE FROM search_index WHERE rowid = :rowid"), {"rowid": rowid})
+    db.session.execute(text(
+        f"INSERT INTO search_index(rowid, item_type, item_id, title, creator, tags) "
+        f"VALUES (:rowid, :item_type, :item_id, :title, :creator, {tags_sql(':item_id')})"),
+        {"rowid": rowid, "item_type": item_type, "item_id": int(item_id), "title": title, "creator": creator})
+
+
+def index_item_tags(item_id, item_type):
+    """
+    Updates the tags of an item in the search_index table from the ItemTags table, including any changes not yet
+    committed. The caller is responsible for committing.
+    :param item_id: The ID of the item.
+    :param item_type: The type of the item.
+    """
+    if not search_index_exists():
+        return
+    db.session.flush()
+    db.session.execute(text(f"UPDATE search_index SET tags = {tags_sql(':item_id')} WHERE rowid = :rowid"),
+                       {"rowid": search_rowid(item_id, item_type), "item_type": item_type, "item_id": int(item_id)})
+
+
+def match_expression(query, columns=("title", "creator"), tags=True):
+    """
+    Converts a search term into an FTS5 query. Every word of the search term must be a prefix of a word in the given
+    columns or, if tags is True, any word of the search term may be a prefix of a word in the tags.
+    :param query: The search term entered by the user.
+    :param columns: The columns every word of the search term must match.
+    :param tags: Whether a word matching a tag is also a match.
+    :return: The FTS5 query, or None if the search term contains no words.
+    """
+    words = [f'"{word}"*' for word in re.findall(r"\w+", query.lower())]
+    if not words:
+        return None
+    expression = f"{{{' '.join(columns)}}} : ({' AND '.join(words)})"
+    if tags:
+        expression += f" OR tags : ({' OR '.join(words)})"
+    return expression
+
+
+def search_matches(query, item_type, columns=("title", "creator"), tags=True):
+    """
+    Builds a subquery of the items of one type matching a search term, with their bm25 rank. A lower rank is a better
+    match.
+    :param query: The search term entered by the user.
+    :param item_type: The type of the items.
+    :param columns: The columns every word of the search term must match.
+    :param tags: Whether a word matching a tag is also a match.
+    :return: A subquery with item_id and rank columns, or None if the search term contains no words or the search_index
+    table has not been created.
+    """
+    expression = match_expression(query, columns, tags)
+    if expression is None or not search_index_exists():
+        return None
+    return text(f"SELECT item_id, bm25(search_index, {RANK_WEIGHTS}) AS rank FROM search_index "
+                f"WHERE search_index MATCH :expression AND item_type = :item_type")\
+        .bindparams(expression=expression, item_type=item_type)\
+        .columns(item_id=db.Integer, rank=db.Float).subquery()
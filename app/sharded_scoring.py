@@ -0,0 +1,200 @@
+from app import app
+from concurrent.futures import ProcessPoolExecutor
+from rapidfuzz import process
+from rapidfuzz.distance import Indel
+import heapq
+import threading
+import numpy
+
+
+class Shard:
+    """
+    A contiguous range of the stored rows of the recommender index, held in memory by one worker process of the
+    ShardedScorer. A shard holds the titles, the CSR tag counts, the norms and the entities of its rows, and scores them
+    against the features of an initial node with the same arithmetic as calculate_recommender.
+    """
+
+    def __init__(self, start, titles, indptr, indices, counts, norms, columns, entities):
+        """
+        :param start: The row of the index held by the first row of the shard.
+        :param titles: The titles of the rows.
+        :param indptr: The CSR row pointer array of the rows, starting at 0.
+        :param indices: The CSR column index array of the rows.
+        :param counts: The CSR data array of the rows.
+        :param norms: The L2 norm of each row.
+        :param columns: The number of tag columns in the stored arrays of the index.
+        :param entities: The entity dictionaries of the rows.
+        """
+        self.start = start
+        self.titles = titles
+        self.indices = indices
+        self.counts = counts
+        self.norms = norms
+        self.columns = columns
+        self.entities = entities
+        self.value_rows = numpy.repeat(numpy.arange(len(titles)), numpy.diff(indptr))
+
+        #An inverted index from each entity to the rows of the shard which have it, as only those rows can have an
+        #entity similarity above 0.
+        postings = {}
+        for row, row_entities in enumerate(entities):
+            for text in row_entities:
+                postings.setdefault(text, []).append(row)
+        self.entity_postings = postings
+
+    def score(self, title, tags, norm, entities, threshold, top_n, stale_rows):
+        """
+        Scores every row of the shard against an initial node. The weighted sum of the similarities is calculated for
+        every row at once, which gives the score before it is rounded, so only the rows whose rounded score could reach
+        the threshold and the top_n are passed to combine_scores.
+        :param title: The title of the initial node.
+        :param tags: The tags of the initial node as {column: count}.
+        :param norm: The L2 norm of the tags of the initial node.
+        :param entities: The entities of the initial node.
+        :param threshold: The weighting threshold.
+        :param top_n: The number of items to keep, or None to keep every item above the threshold.
+        :param stale_rows: A numpy array of rows of the index which have changed since the shard was made. These are
+        scored by the caller and are skipped.
+        :return: A list of (score, -row) tuples, with the row in the index.
+        """
+        from app.recommender import combine_scores, entities_similarity
+
+        title_similarities = process.cdist([title], self.titles, scorer=Indel.normalized_similarity,
+                                           dtype=numpy.float64, workers=1)[0]
+        query = numpy.zeros(self.columns)
+        for column, count in tags.items():
+            if column < self.columns:
+                query[column] = count
+        dots = numpy.bincount(self.value_rows, weights=self.counts * query[self.indices], minlength=len(self.titles))
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            tags_similarities = dots / (norm * self.norms)
+        entities_similarities = numpy.zeros(len(self.titles))
+        for row in {row for text in entities for row in self.entity_postings.get(text, ())}:
+            entities_similarities[row] = entities_similarity(entities, self.entities[row])
+
+        #Rounding to 2 decimal places moves a score by at most 0.05, so the rows within 0.06 of the threshold, and of the
+        #top_n-th best unrounded score, are the only ones which can be kept.
+        unrounded = ((title_similarities * 0.3) + (tags_similarities * 0.6) + (entities_similarities * 0.1)) * 10
+        unrounded = numpy.where(numpy.isnan(unrounded), 0.0, unrounded)
+        stale = stale_rows[(stale_rows >= self.start) & (stale_rows < self.start + len(self.titles))] - self.start
+        unrounded[stale] = -numpy.inf
+        rows = numpy.flatnonzero(unrounded >= threshold - 0.06)
+        if top_n is not None and len(rows) > top_n:
+            floor = numpy.partition(unrounded[rows], len(rows) - top_n)[len(rows) - top_n]
+            rows = rows[unrounded[rows] >= floor - 0.11]
+
+        scores = []
+        for row in rows.tolist():
+            similarity = combine_scores(float(title_similarities[row]), float(tags_similarities[row]),
+                                        float(entities_similarities[row]))
+            if similarity >= threshold:
+                scores.append((similarity, -(row + self.start)))
+        if top_n is not None:
+            return heapq.nlargest(top_n, scores)
+        return scores
+
+
+#The shard held by this worker process.
+_shard = None
+
+
+def load_shard(shard):
+    """
+    Stores the shard of a worker process. This is the initializer of each worker of the ShardedScorer.
+    :param shard: The Shard.
+    """
+    global _shard
+    _shard = shard
+
+
+def score_shard(*args):
+    """
+    Scores the shard of this worker process, see Shard.score.
+    :return: A list of (score, -row) tuples.
+    """
+    return _shard.score(*args)
+
+
+class ShardedScorer:
+    """
+    Scores the catalogue for calculate_recommender across several processes, so a single request is not limited to the
+    one core the GIL allows. The stored rows of a recommender index are split into one contiguous shard per worker,
+    and each shard is held by a persistent single process ProcessPoolExecutor, so every query goes to the process
+    holding that shard. Only the features of the initial node are sent with each query, and each worker returns its
+    partial top_n, which are merged.
+
+    The shards are a snapshot of the stored arrays of the index. The rows the index has changed since, which are the
+    overlay rows and the renamed rows, are skipped by the workers and scored by the calling process instead.
+    """
+
+    def __init__(self, index, workers):
+        """
+        :param index: The RecommenderIndex to shard.
+        :param workers: The number of worker processes.
+        """
+        self.index = index
+        self.workers = workers
+        catalogue_entities = index.catalogue_entities()
+        bounds = numpy.linspace(0, index.stored_rows, workers + 1).astype(numpy.int64).tolist()
+        self.executors = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            indptr = index.indptr[start:end + 1] - index.indptr[start]
+            values = slice(int(index.indptr[start]), int(index.indptr[end]))
+            shard = Shard(start, index.titles[start:end], indptr, index.indices[values], index.counts[values],
+                          index.norms[start:end].copy(), index.stored_columns, catalogue_entities[start:end])
+            self.executors.append(ProcessPoolExecutor(max_workers=1, initializer=load_shard, initargs=(shard,)))
+
+    def scores(self, initial_row, threshold, top_n):
+        """
+        Scores the catalogue against an initial node.
+        :param initial_row: The row of the initial node.
+        :param threshold: The weighting threshold.
+        :param top_n: The number of items to keep, or None to keep every item above the threshold.
+        :return: A list of (score, -row) tuples of every row reaching the threshold, or of the top_n rows.
+        """
+        from app.recommender import score_rows
+
+        index = self.index
+        stale_rows = numpy.union1d(index.overlay_rows, numpy.array(index.unsorted_rows, dtype=numpy.int64))
+        features = (index.titles[initial_row], dict(index.row_tags(initial_row)), float(index.norms[initial_row]),
+                    index.catalogue_entities()[initial_row], threshold, top_n, stale_rows)
+        futures = [executor.submit(score_shard, *features) for executor in self.executors]
+
+        #Score the changed rows here while the workers score their shards.
+        scores = [(similarity, -row) for row, similarity in
+                  zip(stale_rows.tolist(), score_rows(index, initial_row, stale_rows,
+                                                      index.tag_similarities(initial_row, stale_rows)))
+                  if similarity >= threshold]
+        for future in futures:
+            scores += future.result()
+        if top_n is not None:
+            return heapq.nlargest(top_n, scores)
+        return scores
+
+    def shutdown(self):
+        """
+        Stops the worker processes.
+        """
+        for executor in self.executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def get_scorer(index):
+    """
+    Gets the ShardedScorer of this process for a recommender index, starting its workers the first time it is needed.
+    The workers are replaced whenever the index is rebuilt or the RECOMMENDER_WORKERS setting changes.
+    :param index: The RecommenderIndex.
+    :return: The ShardedScorer.
+    """
+    global _scorer
+    with _scorer_lock:
+        workers = app.config['RECOMMENDER_WORKERS']
+        if _scorer is None or _scorer.index is not index or _scorer.workers != workers:
+            if _scorer is not None:
+                _scorer.shutdown()
+            _scorer = ShardedScorer(index, workers)
+        return _scorer
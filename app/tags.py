@@ -1,93 +1,97 @@
-from app.models import *
-from flask_login import current_user, login_user, logout_user, login_required
-import time
-from flask import flash
-from profanity_check import predict
-
-def add_tags(data, id, type):
-    """
-    This function handles adding multiple tags to an item. This function is used by the 'add_book/film/game' endpoints
-    when the user submits a form requesting to add new items and tags. This function is also used when a user uses the
-    TagsForm on the 'search_results.html' page to add new tags to an item that already exists in the database.
-    :param data: The contents of the form containing the tags the user wishes to add.
-    :param id: The item ID the user wishes to add the tags to.
-    :param type: The item type the user wishes to add the tags to.
-    :return cant_add: Returns a list of tags that the system failed to add due to them already existing or the user
-    having added them already.
-    """
-
-    #Break the contents of the form into individual tags.
-    tags = data['tags'].split()
-    cant_add = []
-    added = []
-    offensive = []
-    predictions = predict(tags)
-    if any(predictions):
-        flash(f'The system has detected profanity in the tags you are trying to add. Please remove the profanity and try again', 'danger')
-        return
-    #Iterate through the tags.
-    for tag in tags:
-
-        db_tag = Tags.query.filter_by(tag=tag).first()
-
-        #If the tag does not already exist in the Tags table, add it. Create a record that the user has added the tag.
-        if not db_tag:
-            db_tag = add_tag(tag)
-        item_tag = ItemTags.query.filter_by(item_id=id, item_type=type, tag_id=db_tag.tag_id).first()
-        user_tagged = UserUpvotes.query.filter_by(user_id=current_user.user_id, item_type=type, tag_id=db_tag.tag_id,
-                                                  item_id=id).first()
-
-        #If the user has not already added this tag, create a new record in ItemTags and UserUpvotes.
-        if not item_tag:
-            new_item_tag = ItemTags(item_id=id, item_type=type, tag_id=db_tag.tag_id, count=1)
-            db.session.add(new_item_tag)
-            new_user_tag = UserUpvotes(user_id=current_user.user_id, item_type=type, tag_id=db_tag.tag_id, item_id=id,
-                                       timestamp=int(time.time()))
-            db.session.add(new_user_tag)
-            added.append(tag)
-        else:
-            if not user_tagged:
-                item_tag.count += 1
-                new_user_tag = UserUpvotes(user_id=current_user.user_id, item_type=type, tag_id=db_tag.tag_id, item_id=id,
-                                           timestamp=int(time.time()))
-                db.session.add(new_user_tag)
-                added.append(tag)
-            else:
-                cant_add.append(tag)
-        try:
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            flash(f'An error was encountered trying to add the tags {e}. Please try again.', 'danger')
-            return
-
-    #Prepare the added and cant_add lists to strings which can be flashed to the user, specifying which tags could and could not be added.
-    if len(cant_add) > 0:
-        cant_str = ", ".join(cant_add)
-        if len(added) > 0:
-            added_str = ", ".join(added)
-        else: added_str = "None"
-        flash(f'Failed to add the tags: "{cant_str}". You may have already upvoted/added these. The new tags added are: "{added_str}"',
-            'warning')
-    if len(offensive) > 0:
-        offensive_str = ", ".join(offensive)
-        flash(f'The following tags were deemed offensive: {offensive_str}. They were therefore not allowed to be added', 'danger')
-    else:
-        flash(f'Tags added successfully!', 'success')
-    print(added)
-    print(cant_add)
-    return cant_add
-
-def add_tag(tag_name):
-    """
-    A helper function to add a new tag to the Tags table of the database.
-    :param tag_name: The text of the tag.
-    :return new_tag: Returns the new Tag object that was added to the database.
-    """
-    new_tag = Tags(tag=tag_name)
-    db.session.add(new_tag)
-    try:
-        db.session.commit()
-    except:
-        db.rollback()
-    return new_tag
+from app.models import *
+from flask_login import current_user, login_user, logout_user, login_required
+import time
+from flask import flash
+from app.profanity import predict_profanity, remember_tags
+from app.recommender_index import log_tag_change
+from app.search_index import index_item_tags
+
+def add_tags(data, id, type):
+    """
+    This function handles adding multiple tags to an item. This function is used by the 'add_book/film/game' endpoints
+    when the user submits a form requesting to add new items and tags. This function is also used when a user uses the
+    TagsForm on the 'search_results.html' page to add new tags to an item that already exists in the database.
+    :param data: The contents of the form containing the tags the user wishes to add.
+    :param id: The item ID the user wishes to add the tags to.
+    :param type: The item type the user wishes to add the tags to.
+    :return cant_add: Returns a list of tags that the system failed to add due to them already existing or the user
+    having added them already.
+    """
+
+    #Break the contents of the form into individual tags.
+    tags = data['tags'].split()
+    cant_add = []
+    added = []
+    offensive = []
+    predictions = predict_profanity(tags)
+    if any(predictions):
+        flash(f'The system has detected profanity in the tags you are trying to add. Please remove the profanity and try again', 'danger')
+        return
+
+    #Find the tags which already exist, and add the rest together.
+    db_tags = {db_tag.tag: db_tag for db_tag in Tags.query.filter(Tags.tag.in_(set(tags)))}
+    new_tags = [Tags(tag=tag) for tag in dict.fromkeys(tags) if tag not in db_tags]
+    try:
+        if new_tags:
+            db.session.add_all(new_tags)
+            db.session.flush()
+            db_tags.update({db_tag.tag: db_tag for db_tag in new_tags})
+
+        #Find which of the tags the item already has and which the user has already added, with one query each.
+        tag_ids = [db_tag.tag_id for db_tag in db_tags.values()]
+        item_tags = {item_tag.tag_id: item_tag for item_tag in
+                     ItemTags.query.filter(ItemTags.item_id == id, ItemTags.item_type == type, ItemTags.tag_id.in_(tag_ids))}
+        user_tagged = {upvote.tag_id for upvote in
+                       UserUpvotes.query.filter(UserUpvotes.user_id == current_user.user_id, UserUpvotes.item_id == id,
+                                                UserUpvotes.item_type == type, UserUpvotes.tag_id.in_(tag_ids))}
+
+        #Iterate through the tags.
+        new_item_tag_added = False
+        for tag in tags:
+            tag_id = db_tags[tag].tag_id
+            item_tag = item_tags.get(tag_id)
+
+            #If the item does not have this tag yet, create a new record in ItemTags and UserUpvotes.
+            if not item_tag:
+                item_tags[tag_id] = ItemTags(item_id=id, item_type=type, tag_id=tag_id, count=1)
+                db.session.add(item_tags[tag_id])
+                log_tag_change(id, type, tag_id, 1)
+                new_item_tag_added = True
+            #If the user has already added or upvoted this tag, it cannot be added again.
+            elif tag_id in user_tagged:
+                cant_add.append(tag)
+                continue
+            else:
+                item_tag.count += 1
+                log_tag_change(id, type, tag_id, item_tag.count)
+            db.session.add(UserUpvotes(user_id=current_user.user_id, item_type=type, tag_id=tag_id, item_id=id,
+                                       timestamp=int(time.time())))
+            user_tagged.add(tag_id)
+            added.append(tag)
+
+        #Write every change, and update the search index once if the item has any new tags.
+        if new_item_tag_added:
+            index_item_tags(id, type)
+        db.session.commit()
+        remember_tags([db_tag.tag for db_tag in new_tags])
+    except Exception as e:
+        db.session.rollback()
+        flash(f'An error was encountered trying to add the tags {e}. Please try again.', 'danger')
+        return
+
+    #Prepare the added and cant_add lists to strings which can be flashed to the user, specifying which tags could and could not be added.
+    if len(cant_add) > 0:
+        cant_str = ", ".join(cant_add)
+        if len(added) > 0:
+            added_str = ", ".join(added)
+        else: added_str = "None"
+        flash(f'Failed to add the tags: "{cant_str}". You may have already upvoted/added these. The new tags added are: "{added_str}"',
+            'warning')
+    if len(offensive) > 0:
+        offensive_str = ", ".join(offensive)
+        flash(f'The following tags were deemed offensive: {offensive_str}. They were therefore not allowed to be added', 'danger')
+    else:
+        flash(f'Tags added successfully!', 'success')
+    print(added)
+    print(cant_add)
+    return cant_add
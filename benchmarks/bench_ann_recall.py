@@ -0,0 +1,64 @@
+"""
+Reports the recall@k and latency of the approximate mode of calculate_recommender against the exact mode, for a range of
+TagLSH settings. Recall@k is the fraction of the exact top k items which the approximate mode also returns, averaged
+over a random sample of tagged items from the database.
+
+Run from the project root with: python -m benchmarks.bench_ann_recall [sample size] [k] [weighting]
+"""
+import random
+import sys
+import time
+from app import app
+from app.ann import TagLSH
+from app.recommender import calculate_recommender
+from app.recommender_index import get_index
+
+#(tables, bits, probes) settings to compare, from the fastest to the most accurate.
+SETTINGS = [(4, 16, 0), (8, 14, 0), (8, 12, 2), (16, 12, 2), (16, 10, 4)]
+
+
+def timed_top_k(keys, k, weighting, approximate):
+    """
+    Runs calculate_recommender for each item.
+    :param keys: A list of (id, type) tuples.
+    :param k: The number of items to keep.
+    :param weighting: The weighting threshold.
+    :param approximate: Whether to use approximate mode.
+    :return: A tuple of the list of results and the mean time per item in milliseconds.
+    """
+    start = time.perf_counter()
+    results = [calculate_recommender(item_id, item_type, weighting, k, approximate) for item_id, item_type in keys]
+    return results, (time.perf_counter() - start) * 1000 / len(keys)
+
+
+def main():
+    sample_size = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    weighting = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+
+    with app.app_context():
+        index = get_index()
+        tagged = [key for key, norm in zip(index.keys, index.norms) if norm > 0]
+        keys = random.Random(0).sample(tagged, min(sample_size, len(tagged)))
+        exact, exact_time = timed_top_k(keys, k, weighting, False)
+
+        print(f"{len(index.keys)} items, {len(keys)} queries, k={k}, exact mode {exact_time:.2f} ms per query")
+        print(f"{'tables':>7} {'bits':>5} {'probes':>7} {'build (s)':>10} {'recall@k':>9} {'ms/query':>9} {'speedup':>8}")
+        for tables, bits, probes in SETTINGS:
+            start = time.perf_counter()
+            index.lsh = TagLSH(index, tables, bits, probes)
+            build_time = time.perf_counter() - start
+
+            approximate, approximate_time = timed_top_k(keys, k, weighting, True)
+            recalls = []
+            for exact_items, approximate_items in zip(exact, approximate):
+                if exact_items:
+                    recalls.append(len(exact_items.keys() & approximate_items.keys()) / len(exact_items))
+            recall = sum(recalls) / len(recalls) if recalls else 1.0
+            print(f"{tables:>7} {bits:>5} {probes:>7} {build_time:>10.2f} {recall:>9.3f} {approximate_time:>9.2f} "
+                  f"{exact_time / approximate_time:>7.1f}x")
+        index.lsh = None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Measures the cold start of the app and the memory used by forked workers, with the spacy model loaded in each of the
+ways the app has used:
+
+- lazy: the app is imported and '/about' is requested, which never loads the model.
+- eager: the full model is loaded when the app is imported, as it was before it was loaded lazily.
+- trimmed: only the components named entity recognition needs are loaded, as get_nlp_entity does.
+
+For each scenario a fresh interpreter imports the app, and the import time, the time to the first entity extraction and
+the resident memory are reported. The parent then forks workers, each of which extracts entities, and reports the
+proportional and private memory of each worker, with and without gc.freeze before forking. The worker memory figures
+need Linux, as they are read from /proc.
+
+Run from the project root with: python -m benchmarks.bench_cold_start [workers]
+"""
+import json
+import subprocess
+import sys
+
+SCENARIO = r'''
+import gc, json, os, resource, sys, time
+mode, workers, freeze = sys.argv[1], int(sys.argv[2]), sys.argv[3] == "1"
+
+def memory():
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            for line in smaps:
+                field = line.split()
+                if field[0] in ("Rss:", "Pss:", "Private_Clean:", "Private_Dirty:"):
+                    usage[field[0][:-1]] = int(field[1]) / 1024
+    except OSError:
+        usage["Rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    usage["Private"] = usage.pop("Private_Clean", 0) + usage.pop("Private_Dirty", 0)
+    return usage
+
+start = time.perf_counter()
+from app import app
+import app.entities as entities
+if mode == "eager":
+    import spacy
+    entities._nlp_entity = spacy.load(entities.NLP_MODEL)
+import_time = time.perf_counter() - start
+
+with app.test_client() as client:
+    client.get("/about")
+about_time = time.perf_counter() - start
+loaded = entities._nlp_entity is not None
+if mode != "lazy":
+    entities.extract_entities("The Lord of the Rings: The Return of the King")
+first_entities_time = time.perf_counter() - start
+result = {"import_s": import_time, "about_s": about_time, "first_entities_s": first_entities_time,
+          "model_loaded_by_about": loaded, "parent": memory(), "workers": []}
+
+if workers and mode != "lazy" and hasattr(os, "fork"):
+    gc.collect()
+    if freeze:
+        gc.freeze()
+    pipes = []
+    for _ in range(workers):
+        read, write = os.pipe()
+        if os.fork() == 0:
+            os.close(read)
+            for title in ("Harry Potter and the Goblet of Fire", "Star Wars: A New Hope", "Dune"):
+                entities.extract_entities(title)
+            gc.collect()
+            os.write(write, json.dumps(memory()).encode())
+            time.sleep(1)
+            os._exit(0)
+        os.close(write)
+        pipes.append(read)
+    for read in pipes:
+        with os.fdopen(read) as pipe:
+            result["workers"].append(json.loads(pipe.read()))
+    for _ in pipes:
+        os.wait()
+print(json.dumps(result))
+'''
+
+
+def run(mode, workers, freeze):
+    """
+    Runs one scenario in a fresh interpreter.
+    :param mode: lazy, eager or trimmed.
+    :param workers: The number of workers to fork.
+    :param freeze: Whether to call gc.freeze before forking.
+    :return: The measurements of the scenario.
+    """
+    output = subprocess.run([sys.executable, "-c", SCENARIO, mode, str(workers), "1" if freeze else "0"],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    print(f"{'scenario':<18}{'import s':>10}{'/about s':>10}{'entities s':>12}{'RSS MB':>10}"
+          f"{'worker Pss MB':>15}{'worker private MB':>19}")
+    for mode, freeze in (("lazy", False), ("eager", False), ("trimmed", False), ("trimmed", True)):
+        result = run(mode, workers, freeze)
+        name = mode + (" + freeze" if freeze else "")
+        pss = private = "-"
+        if result["workers"]:
+            pss = f"{sum(w.get('Pss', 0) for w in result['workers']) / len(result['workers']):.1f}"
+            private = f"{sum(w['Private'] for w in result['workers']) / len(result['workers']):.1f}"
+        print(f"{name:<18}{result['import_s']:>10.2f}{result['about_s']:>10.2f}{result['first_entities_s']:>12.2f}"
+              f"{result['parent']['Rss']:>10.1f}{pss:>15}{private:>19}")
+        if mode == "lazy" and result["model_loaded_by_about"]:
+            print("The model was loaded by '/about', so it is not loaded lazily.")
+
+
+if __name__ == "__main__":
+    main()
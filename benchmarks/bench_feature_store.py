@@ -0,0 +1,97 @@
+"""
+Compares building the recommender index from the database in every process against memory mapping it from the feature
+store. Several processes are started at once, as the workers of a server would be, and each one gets the index, loads
+the entities and answers a query. The time taken and the proportional (Pss) and private memory of each process are
+reported. The memory figures need Linux, as they are read from /proc.
+
+A feature store is saved first if none exists. Run from the project root with:
+python -m benchmarks.bench_feature_store [processes]
+"""
+import json
+import subprocess
+import sys
+from app import app
+from app.feature_store import current_feature_store, save_feature_store
+from app.recommender_index import RecommenderIndex
+
+WORKER = r'''
+import json, sys, time
+mode = sys.argv[1]
+
+def memory():
+    usage = {"Pss": 0.0, "Private": 0.0}
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            for line in smaps:
+                field = line.split()
+                if field[0] == "Pss:":
+                    usage["Pss"] = int(field[1]) / 1024
+                elif field[0] in ("Private_Clean:", "Private_Dirty:"):
+                    usage["Private"] += int(field[1]) / 1024
+    except OSError:
+        pass
+    return usage
+
+from app import app
+import app.recommender_index as recommender_index
+from app.recommender import calculate_recommender
+with app.app_context():
+    before = memory()
+    start = time.perf_counter()
+    if mode == "database":
+        recommender_index.current_feature_store = lambda: None
+    index = recommender_index.get_index()
+    index.catalogue_entities()
+    loaded = time.perf_counter() - start
+    calculate_recommender(index.keys[0][0], index.keys[0][1], 0, 10, False)
+    print("ready", flush=True)
+    sys.stdin.readline()
+    after = memory()
+    print(json.dumps({"load_s": loaded, "pss_mb": after["Pss"] - before["Pss"],
+                      "private_mb": after["Private"] - before["Private"]}), flush=True)
+    sys.stdin.read()
+'''
+
+
+def run(mode, processes):
+    """
+    Starts several processes which each get the recommender index, and waits until they all have it before measuring
+    them, so the shared pages are counted across all of them.
+    :param mode: "database" to build the index from the database, or "store" to load it from the feature store.
+    :param processes: The number of processes.
+    :return: A list of the measurements of each process.
+    """
+    workers = [subprocess.Popen([sys.executable, "-c", WORKER, mode], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                text=True) for _ in range(processes)]
+    for worker in workers:
+        for line in worker.stdout:
+            if line.strip() == "ready":
+                break
+        else:
+            raise RuntimeError(f"A {mode} process exited before loading the index")
+    results = []
+    for worker in workers:
+        worker.stdin.write("\n")
+        worker.stdin.flush()
+        results.append(json.loads(worker.stdout.readline()))
+    for worker in workers:
+        worker.communicate()
+    return results
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    with app.app_context():
+        if current_feature_store() is None:
+            save_feature_store(RecommenderIndex.build())
+
+    print(f"{'index from':<10}{'load s':>9}{'Pss MB':>9}{'private MB':>12}   per process, {processes} processes")
+    for mode in ("database", "store"):
+        results = run(mode, processes)
+        print(f"{mode:<10}{sum(r['load_s'] for r in results) / processes:>9.2f}"
+              f"{sum(r['pss_mb'] for r in results) / processes:>9.1f}"
+              f"{sum(r['private_mb'] for r in results) / processes:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compares the IGDB lookups made by add_game_to_database before and after it used the IGDBClient, against a local stub of
+the Twitch token endpoint and the IGDB API which adds a fixed delay to every response, as a round trip to IGDB would.
+The old lookups requested a new token for every game added, and made three requests one after the other for every
+matching search result. The client caches the token, keeps its connections open, and makes three batched requests
+however many results match. The number of requests, the time taken and whether both give the same covers and
+developers are reported.
+
+Run from the project root with: python -m benchmarks.bench_igdb_client [results per search] [delay ms]
+"""
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import ThreadingHTTPServer
+import requests
+from app.igdb import IGDBClient
+from tests.igdb_stub import StubIGDB, YEAR
+
+SEARCHES = 10
+
+
+def old_lookups(base, title):
+    """
+    Makes the lookups of one game the way add_game_to_database used to.
+    :param base: The URL of the stub server.
+    :param title: The title searched for.
+    :return: A dictionary with the game ID as the key and a (cover URL, developer) tuple as the value.
+    """
+    access_token = requests.post(f"{base}/oauth2/token?client_id=id&client_secret=s&grant_type=client_credentials")\
+        .json()["access_token"]
+    headers = {"Client-ID": "id", "Authorization": f"Bearer {access_token}"}
+    details = {}
+    for response in requests.post(f"{base}/v4/games", headers=headers, data=f'fields *; search "{title}";').json():
+        if str(datetime.fromtimestamp(response['first_release_date']).year) != str(YEAR):
+            continue
+        c_info = requests.post(f"{base}/v4/covers", headers=headers,
+                               data=f'fields *; where id = ({response["cover"]});').json()
+        involved_info = requests.post(f"{base}/v4/involved_companies", headers=headers,
+                                      data=f'fields *; where id=({response["involved_companies"][0]});').json()
+        final_info = requests.post(f"{base}/v4/companies", headers=headers,
+                                   data=f'fields *; where id=({involved_info[0]["company"]});').json()
+        details[response['id']] = (c_info[0]['url'], final_info[0]['name'])
+    return details
+
+
+def new_lookups(client, title):
+    """
+    Makes the lookups of one game with the IGDBClient, as add_game_to_database does now.
+    :param client: The IGDBClient.
+    :param title: The title searched for.
+    :return: A dictionary with the game ID as the key and a (cover URL, developer) tuple as the value.
+    """
+    games = [game for game in client.search_games(title)
+             if str(datetime.fromtimestamp(game['first_release_date']).year) == str(YEAR)]
+    return client.game_details(games)
+
+
+def main():
+    StubIGDB.results = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    StubIGDB.delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubIGDB)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    client = IGDBClient("id", "s", f"{base}/v4", f"{base}/oauth2/token")
+
+    print(f"{SEARCHES} games added, {StubIGDB.results} matching results each, {StubIGDB.delay * 1000:.0f} ms per request")
+    print(f"{'lookups':<8}{'requests':>10}{'ms per game':>13}")
+    results = {}
+    for name, lookup in (("old", lambda title: old_lookups(base, title)), ("client", lambda title: new_lookups(client, title))):
+        StubIGDB.requests = 0
+        start = time.perf_counter()
+        results[name] = [lookup(f"Game {search}") for search in range(SEARCHES)]
+        elapsed = (time.perf_counter() - start) * 1000 / SEARCHES
+        print(f"{name:<8}{StubIGDB.requests:>10}{elapsed:>13.1f}")
+    print(f"Same covers and developers: {results['old'] == results['client']}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares the latency of search_catalogue using the search_index full-text index against search_catalogue using ilike,
+which scans the item tables, and of find_item against the ilike title lookup it replaced in '/visualise'.
+
+Run from the project root with: python -m benchmarks.bench_search_fts [search term ...]
+"""
+import sys
+import time
+from app import app, init_db
+from app.models import *
+from app.get_info import search_catalogue, find_item
+
+TERMS = ["zzzz", "quest", "harry potter", "shadow moon"]
+
+
+def timed(function, *args, repeat=3):
+    """
+    Times a function, taking the best of several runs.
+    :param function: The function to time.
+    :param args: The arguments to call it with.
+    :param repeat: The number of runs.
+    :return: A tuple of the result and the best time in milliseconds.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def ilike_title(title, item_type):
+    model = {"book": Books, "film": Films, "game": Games}[item_type]
+    return model.query.filter(model.title.ilike(f'%{title}%')).first()
+
+
+def main():
+    terms = sys.argv[1:] or TERMS
+    with app.app_context():
+        init_db()
+        items = Books.query.count() + Films.query.count() + Games.query.count()
+        print(f"{items} items")
+        print(f"{'term':>14} {'fts results':>12} {'fts (ms)':>9} {'ilike results':>14} {'ilike (ms)':>11} "
+              f"{'title fts (ms)':>15} {'title ilike (ms)':>17}")
+        for term in terms:
+            fts, fts_time = timed(search_catalogue, term)
+            ilike, ilike_time = timed(search_catalogue, term, False)
+            title_fts, title_fts_time = timed(find_item, term, "film")
+            title_ilike, title_ilike_time = timed(ilike_title, term, "film")
+            print(f"{term:>14} {len(fts):>12} {fts_time:>9.1f} {len(ilike):>14} {ilike_time:>11.1f} "
+                  f"{title_fts_time:>15.1f} {title_ilike_time:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Counts the SQL queries issued by a request to the '/search_results' endpoint, for search terms matching a growing number
+of items, to check that the number of queries stays the same however many items match.
+
+Run from the project root with: python -m benchmarks.bench_search_queries [search term ...]
+"""
+import sys
+import time
+from sqlalchemy import event
+from app import app, db
+
+TERMS = ["zzzz", "ring", "the", "a", "e"]
+
+
+def main():
+    terms = sys.argv[1:] or TERMS
+    queries = []
+    client = app.test_client()
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+
+    print(f"{'term':>10} {'results':>8} {'queries':>8} {'time (ms)':>10}")
+    for term in terms:
+        queries.clear()
+        start = time.perf_counter()
+        response = client.get("/search_results", query_string={"query": term})
+        elapsed = (time.perf_counter() - start) * 1000
+        results = response.get_data(as_text=True).count('<li class="item">')
+        print(f"{term:>10} {results:>8} {len(queries):>8} {elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Measures the throughput of calculate_recommender in exact mode when scoring in the request's own process, and when
+scoring across 1, 2, 4 and 8 worker processes with the ShardedScorer. Queries are sent from several threads at once, as
+the threads of a server would, and the results of every worker count are checked against the in-process results.
+
+Run from the project root with: python -m benchmarks.bench_sharded_scoring [sample size] [k] [threads]
+"""
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app import app
+from app.recommender import calculate_recommender
+from app.recommender_index import get_index
+from app.sharded_scoring import get_scorer
+
+WORKERS = [1, 2, 4, 8]
+
+
+def run_queries(keys, k, threads):
+    """
+    Runs calculate_recommender for each item from a pool of threads.
+    :param keys: A list of (id, type) tuples.
+    :param k: The number of items to keep.
+    :param threads: The number of threads sending queries.
+    :return: A tuple of the list of results and the number of queries per second.
+    """
+    def query(key):
+        with app.app_context():
+            return calculate_recommender(key[0], key[1], 0, k, False)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(query, keys))
+    return results, len(keys) / (time.perf_counter() - start)
+
+
+def main():
+    sample_size = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    with app.app_context():
+        index = get_index()
+        index.catalogue_entities()
+        keys = random.Random(0).sample(list(index.keys), min(sample_size, len(index.keys)))
+
+        app.config['RECOMMENDER_WORKERS'] = 0
+        expected, baseline = run_queries(keys, k, threads)
+        print(f"{len(index.keys)} items, {len(keys)} queries, k={k}, {threads} threads")
+        print(f"{'workers':>8} {'queries/s':>10} {'speedup':>8} {'same results':>13}")
+        print(f"{'-':>8} {baseline:>10.1f} {1:>7.1f}x {'-':>13}")
+        for workers in WORKERS:
+            app.config['RECOMMENDER_WORKERS'] = workers
+            #Start the workers and load their shards before timing.
+            calculate_recommender(keys[0][0], keys[0][1], 0, k, False)
+            results, throughput = run_queries(keys, k, threads)
+            same = all(list(result.items()) == list(exact.items()) for result, exact in zip(results, expected))
+            print(f"{workers:>8} {throughput:>10.1f} {throughput / baseline:>7.1f}x {str(same):>13}")
+        get_scorer(index).shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Compares scoring one title against the whole catalogue with title_sum, one call per pair, against titles_similarity,
+which scores every pair in a single call to rapidfuzz.
+
+Run from the project root with: python -m benchmarks.bench_title_similarity
+"""
+import random
+import string
+import time
+import numpy
+from app.recommender import title_sum, titles_similarity
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def random_titles(count, seed=0):
+    """
+    Generates random titles with a similar length and alphabet to the titles in the catalogue.
+    :param count: The number of titles to generate.
+    :param seed: The seed for the random number generator.
+    :return: A list of titles.
+    """
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + "     "
+    return ["".join(rng.choices(alphabet, k=rng.randint(5, 50))) for _ in range(count)]
+
+
+def main():
+    query = "The Lord of the Rings: The Fellowship of the Ring"
+    print(f"{'titles':>10} {'title_sum (s)':>15} {'cdist (s)':>12} {'speedup':>9}")
+    for size in SIZES:
+        titles = random_titles(size)
+
+        start = time.perf_counter()
+        looped = numpy.array([title_sum(query, title) for title in titles])
+        looped_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = titles_similarity([query], titles)[0]
+        batched_time = time.perf_counter() - start
+
+        assert numpy.array_equal(looped, batched)
+        print(f"{size:>10} {looped_time:>15.3f} {batched_time:>12.3f} {looped_time / batched_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Extracts the entities of every title in the database and stores them in the TitleEntities table, streaming the titles
+through the spacy model in batches. Run it after importing many items, or with --all after upgrading the spacy model,
+from the project root with:
+
+python build_entities.py [--all] [--batch-size N] [--n-process N]
+
+Progress is saved to a checkpoint after every commit, so an interrupted run carries on from where it stopped when run
+again with the same options. Restart the app afterwards, as running processes keep the entities they have already loaded.
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from app import app, db, init_db
+from app.models import *
+from app.entities import pipe_entities, write_entities, title_hash, nlp_model_version
+
+ITEM_MODELS = [("book", Books), ("film", Films), ("game", Games)]
+
+CHECKPOINT = os.path.join(app.config['DATA_FOLDER'], 'entities_checkpoint.json')
+
+
+def read_checkpoint(model_version, rebuild_all):
+    """
+    Reads the checkpoint of an interrupted run, if it was made with the same model and options.
+    :param model_version: The name and version of the spacy model.
+    :param rebuild_all: Whether every title is being extracted, rather than only new and renamed titles.
+    :return: The (type, id) tuple of the last stored item, or None to start from the beginning.
+    """
+    try:
+        with open(CHECKPOINT) as file:
+            checkpoint = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if checkpoint.get("model") != model_version or checkpoint.get("all") != rebuild_all:
+        return None
+    return checkpoint["type"], checkpoint["id"]
+
+
+def write_checkpoint(model_version, rebuild_all, position):
+    """
+    Saves the last stored item, replacing the previous checkpoint in one step so it is never left half written.
+    :param model_version: The name and version of the spacy model.
+    :param rebuild_all: Whether every title is being extracted.
+    :param position: The (type, id) tuple of the last stored item.
+    """
+    with open(CHECKPOINT + ".tmp", "w") as file:
+        json.dump({"model": model_version, "all": rebuild_all, "type": position[0], "id": position[1]}, file)
+    os.replace(CHECKPOINT + ".tmp", CHECKPOINT)
+
+
+def catalogue_titles(start, rebuild_all, chunk_size):
+    """
+    Streams the items whose entities need extracting, ordered by type and then ID, reading one chunk at a time so the
+    catalogue is never held in memory and no query is left open across commits.
+    :param start: The (type, id) tuple to carry on after, or None.
+    :param rebuild_all: Whether to include items whose stored entities match their current title.
+    :param chunk_size: The number of items read per query.
+    :return: A generator of (id, type, title) tuples.
+    """
+    types = [item_type for item_type, model in ITEM_MODELS]
+    for item_type, model in ITEM_MODELS:
+        if start is not None and types.index(item_type) < types.index(start[0]):
+            continue
+        last_id = start[1] if start is not None and start[0] == item_type else 0
+        while True:
+            rows = db.session.query(model.id, model.title, TitleEntities.title_hash)\
+                .outerjoin(TitleEntities, db.and_(TitleEntities.item_id == model.id,
+                                                  TitleEntities.item_type == item_type))\
+                .filter(model.id > last_id).order_by(model.id).limit(chunk_size).all()
+            if not rows:
+                break
+            for item_id, title, stored_hash in rows:
+                if rebuild_all or stored_hash != title_hash(title):
+                    yield item_id, item_type, title
+            last_id = rows[-1][0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract and store the entities of every title.")
+    parser.add_argument("--all", action="store_true", help="Extract the entities of every title, rather than only "
+                                                           "titles with no stored entities or which have been renamed.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="The number of titles the model processes at once.")
+    parser.add_argument("--n-process", type=int, default=1, help="The number of processes running the model.")
+    parser.add_argument("--commit-every", type=int, default=5000, help="The number of items written per commit.")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint of an interrupted run.")
+    args = parser.parse_args()
+
+    with app.app_context():
+        init_db()
+        model_version = nlp_model_version()
+        start = None if args.restart else read_checkpoint(model_version, args.all)
+        if start is not None:
+            print(f"Carrying on after {start[0]} {start[1]}")
+        total = sum(model.query.count() for item_type, model in ITEM_MODELS)
+
+        #The items are read ahead of the model by tee, so each result is paired with the item it belongs to.
+        items, titles = itertools.tee(catalogue_titles(start, args.all, args.commit_every))
+        results = zip(items, pipe_entities((title for item_id, item_type, title in titles), args.batch_size,
+                                           args.n_process))
+
+        began = time.perf_counter()
+        extracted = 0
+        while True:
+            rows = [(item_id, item_type, title, entities)
+                    for (item_id, item_type, title), entities in itertools.islice(results, args.commit_every)]
+            if not rows:
+                break
+            write_entities(rows)
+            db.session.commit()
+            write_checkpoint(model_version, args.all, (rows[-1][1], rows[-1][0]))
+            extracted += len(rows)
+            print(f"Extracted {extracted} titles, up to {rows[-1][1]} {rows[-1][0]} of {total} items, "
+                  f"{extracted / (time.perf_counter() - began):.1f} titles/s")
+
+        if os.path.exists(CHECKPOINT):
+            os.remove(CHECKPOINT)
+        print(f"Extracted the entities of {extracted} titles with {model_version} in "
+              f"{time.perf_counter() - began:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Saves the recommender index as a new version of the feature store in app/data/features, which every process running the
+app memory maps instead of building its own copy of the index from the database. Running processes switch to the new
+version on their next request. Run it after the catalogue changes, for example nightly with build_neighbours.py, from
+the project root with:
+
+python build_features.py
+"""
+import time
+from app import app, init_db
+from app.feature_store import save_feature_store
+from app.recommender_index import RecommenderIndex, prune_changes
+
+
+def main():
+    with app.app_context():
+        init_db()
+        start = time.perf_counter()
+        index = RecommenderIndex.build()
+        path = save_feature_store(index)
+        prune_changes(index.version)
+        print(f"Saved the features of {len(index.keys)} items to {path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Builds the neighbours table, which holds the top K highest scoring items for every item in the database so that
+generate_graph can serve the graphs of unchanged items without scoring them. This is intended to be run nightly from the
+project root with:
+
+python build_neighbours.py [-k K]
+"""
+import argparse
+import time
+from app import app, db, init_db
+from app.neighbours import start_build, add_neighbours, finish_build
+from app.recommender import calculate_recommender
+from app.recommender_index import get_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the top K neighbours of every item.")
+    parser.add_argument("-k", type=int, default=10, help="The number of neighbours to store for each item. Graphs with "
+                                                         "more nodes than this are always scored live.")
+    parser.add_argument("--commit-every", type=int, default=1000, help="The number of items written per commit.")
+    args = parser.parse_args()
+
+    with app.app_context():
+        init_db()
+        #Items changed after the index is read are newer than the build, so generate_graph scores them live.
+        index = get_index()
+        build = start_build(args.k, index.version)
+        keys = list(index.keys)
+
+        start = time.perf_counter()
+        for position, (item_id, item_type) in enumerate(keys, 1):
+            add_neighbours(build, item_id, item_type, calculate_recommender(item_id, item_type, 0, args.k, False))
+            if position % args.commit_every == 0 or position == len(keys):
+                db.session.commit()
+                print(f"{position}/{len(keys)} items, {position / (time.perf_counter() - start):.1f} items/s")
+        finish_build(build)
+        print(f"Built the top {args.k} neighbours of {len(keys)} items in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Gunicorn settings for serving the app, used with: gunicorn app:app
+
+The app is loaded once in the master process, and the spacy model and the recommender index are loaded before the
+workers are forked, so every worker shares them copy-on-write instead of loading its own copy.
+"""
+import gc
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+preload_app = True
+
+
+def when_ready(server):
+    """
+    Creates any missing tables and warms up the app in the master process before the workers are forked.
+    :param server: The gunicorn arbiter.
+    """
+    from app import app, db, init_db
+    from app.entities import get_nlp_entity
+    from app.recommender_index import get_index
+
+    with app.app_context():
+        init_db()
+        get_nlp_entity()
+        if os.environ.get("WARM_RECOMMENDER_INDEX", "1") == "1":
+            get_index()
+        #Connections must not be shared between processes, so each worker opens its own.
+        db.engine.dispose()
+
+    #Move everything loaded so far out of the garbage collector's generations, so collections in the workers do not
+    #write to the shared pages and copy them.
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,237 @@
+"""
+Imports books, films or games in bulk from a CSV or JSONL dump, without calling the APIs used by the add item pages.
+The dump is read in chunks, each chunk is checked against the titles already in the database with one query, and the
+new items are inserted with one statement per chunk inside large transactions. The search index, the IndexChanges
+entries which keep the recommender index of every process up to date, the entities of the new titles and, if one has
+been saved, the feature store are then rebuilt once at the end. Run it from the project root with:
+
+python import_catalogue.py --source google-books books.jsonl
+python import_catalogue.py --source omdb films.csv
+python import_catalogue.py --source igdb games.jsonl
+
+The shapes read for each source are:
+
+google-books: Google Books volumes, either whole ({"volumeInfo": {...}}) or just the volumeInfo, with title, authors,
+publishedDate, publisher, industryIdentifiers and imageLinks.thumbnail. CSV dumps use the columns title, authors
+(separated by ";"), publishedDate, publisher, isbn_13, isbn_10 or isbn, and thumbnail.
+omdb: OMDb responses with Title, Director, Year, Production and Poster. "N/A" is read as missing.
+igdb: IGDB games with name, first_release_date, cover.url and involved_companies.company.name expanded, as exported
+with "fields name, first_release_date, cover.url, involved_companies.company.name;". CSV dumps use the columns name,
+first_release_date, cover_url and developer.
+
+Rows missing a value the catalogue requires are skipped and counted as rejected.
+"""
+import argparse
+import csv
+import itertools
+import json
+import time
+from datetime import datetime
+from app import app, db, init_db
+from app.models import *
+from app.entities import pipe_entities, write_entities
+from app.feature_store import current_feature_store, save_feature_store
+from app.recommender_index import RecommenderIndex, log_items_after, prune_changes
+from app.search_index import index_items_after
+
+
+def present(value):
+    """
+    Gets a value from a dump, treating empty strings and OMDb's "N/A" as missing.
+    :param value: The value.
+    :return: The value, or None if it is missing.
+    """
+    if value is None or (isinstance(value, str) and value.strip() in ("", "N/A")):
+        return None
+    return value.strip() if isinstance(value, str) else value
+
+
+def google_books_item(record):
+    """
+    Reads a book from a Google Books volume, in the same way as add_book_to_database.
+    :param record: The volume, or a row of a CSV dump.
+    :return: A dictionary of the Books columns, or None if the title, author or ISBN is missing.
+    """
+    info = record.get('volumeInfo', record)
+    authors = present(info.get('authors'))
+    if isinstance(authors, str):
+        authors = authors.split(';')
+    identifiers = {item.get('type'): item.get('identifier') for item in info.get('industryIdentifiers') or []}
+    isbn = (identifiers.get('ISBN_13') or identifiers.get('ISBN_10') or next(iter(identifiers.values()), None)
+            or present(info.get('isbn_13')) or present(info.get('isbn_10')) or present(info.get('isbn')))
+    item = {'title': present(info.get('title')), 'author': present(authors[0]) if authors else None,
+            'year': str(present(info.get('publishedDate')) or 'Unknown')[:4],
+            'publisher': present(info.get('publisher')) or 'Unknown', 'isbn': isbn,
+            'cover': present((info.get('imageLinks') or {}).get('thumbnail')) or present(info.get('thumbnail'))
+            or 'default_cover_url'}
+    return item if item['title'] and item['author'] and item['isbn'] else None
+
+
+def omdb_item(record):
+    """
+    Reads a film from an OMDb response, in the same way as add_film_to_database.
+    :param record: The response, or a row of a CSV dump.
+    :return: A dictionary of the Films columns, or None if the title or director is missing.
+    """
+    if record.get('Response') == 'False':
+        return None
+    item = {'title': present(record.get('Title')), 'director': present(record.get('Director')),
+            'year': str(present(record.get('Year')) or 'Unknown')[:4],
+            'production_company': present(record.get('Production')), 'cover': present(record.get('Poster'))}
+    return item if item['title'] and item['director'] else None
+
+
+def igdb_item(record):
+    """
+    Reads a game from an IGDB game, in the same way as add_game_to_database. The developer is the first involved
+    company.
+    :param record: The game, or a row of a CSV dump.
+    :return: A dictionary of the Games columns, or None if the name, release date or developer is missing.
+    """
+    released = present(record.get('first_release_date'))
+    cover = record.get('cover')
+    involved = record.get('involved_companies') or []
+    company = involved[0].get('company') if involved and isinstance(involved[0], dict) else None
+    item = {'title': present(record.get('name')),
+            'year': str(datetime.fromtimestamp(int(released)).year) if released is not None else None,
+            'developer': present(company.get('name')) if isinstance(company, dict) else present(record.get('developer')),
+            'cover': present(cover.get('url')) if isinstance(cover, dict) else present(record.get('cover_url'))}
+    return item if item['title'] and item['year'] and item['developer'] else None
+
+
+#The item type, model and reader of each source.
+SOURCES = {'google-books': ("book", Books, google_books_item), 'omdb': ("film", Films, omdb_item),
+           'igdb': ("game", Games, igdb_item)}
+
+
+def read_records(path, file_format):
+    """
+    Streams the records of a dump one at a time.
+    :param path: The path of the dump.
+    :param file_format: "csv" or "jsonl".
+    :return: A generator of dictionaries.
+    """
+    with open(path, newline='', encoding='utf-8') as file:
+        if file_format == "csv":
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def import_chunk(model, items):
+    """
+    Inserts the items of a chunk which are not already in the database, with one query to find the titles which
+    already exist and one insert statement. Items inserted by earlier chunks are found by the same query, as they are
+    in the same transaction.
+    :param model: The model of the items.
+    :param items: A list of dictionaries of the columns of each item.
+    :return: The number of items inserted.
+    """
+    #Keep the first item with each title.
+    new = {}
+    for item in items:
+        new.setdefault(item['title'], item)
+    existing = {title for title, in db.session.query(model.title).filter(model.title.in_(list(new)))}
+    rows = [item for title, item in new.items() if title not in existing]
+    if rows:
+        db.session.execute(model.__table__.insert(), rows)
+    return len(rows)
+
+
+def rebuild_derived(item_type, model, last_id, max_id, batch_size, n_process, skip_entities):
+    """
+    Updates everything derived from the item tables for the items with an ID above last_id and up to max_id, once, after
+    they have all been inserted. Items added through the app while the import was running are already indexed, and are
+    indexed again harmlessly if their IDs fall in the range.
+    :param item_type: The type of the items.
+    :param model: The model of the items.
+    :param last_id: The highest ID before the import.
+    :param max_id: The highest ID after the import.
+    :param batch_size: The number of titles the spacy model processes at once.
+    :param n_process: The number of processes running the spacy model.
+    :param skip_entities: Whether to leave the entities to build_entities.py.
+    """
+    start = time.perf_counter()
+    index_items_after(item_type, last_id, max_id)
+    log_items_after(item_type, last_id, max_id)
+    db.session.commit()
+    print(f"Updated the search index and the index changes in {time.perf_counter() - start:.1f}s")
+
+    if not skip_entities:
+        start = time.perf_counter()
+        extracted = 0
+        while True:
+            items = db.session.query(model.id, model.title).filter(model.id > last_id, model.id <= max_id)\
+                .order_by(model.id).limit(10000).all()
+            if not items:
+                break
+            write_entities([(item_id, item_type, title, entities) for (item_id, title), entities
+                            in zip(items, pipe_entities([title for item_id, title in items], batch_size, n_process))])
+            db.session.commit()
+            extracted += len(items)
+            last_id = items[-1][0]
+        print(f"Extracted the entities of {extracted} titles in {time.perf_counter() - start:.1f}s")
+
+    #Processes using the feature store would otherwise apply every new item as a change to the old version. Saving it
+    #needs the entities of every title, so it is left until they have been extracted.
+    if current_feature_store() is not None and skip_entities:
+        print("Run build_entities.py and then build_features.py to save a new version of the feature store")
+    elif current_feature_store() is not None:
+        start = time.perf_counter()
+        index = RecommenderIndex.build()
+        save_feature_store(index)
+        prune_changes(index.version)
+        print(f"Saved a new version of the feature store in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import books, films or games in bulk from a CSV or JSONL dump.")
+    parser.add_argument("path", help="The path of the dump.")
+    parser.add_argument("--source", required=True, choices=sorted(SOURCES), help="The API the dump was exported from.")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="The format of the dump. By default this is read "
+                                                                   "from the file extension.")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="The number of rows checked and inserted at once.")
+    parser.add_argument("--commit-every", type=int, default=100000, help="The number of rows read per transaction.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="The number of titles the spacy model processes "
+                                                                     "at once.")
+    parser.add_argument("--n-process", type=int, default=1, help="The number of processes running the spacy model.")
+    parser.add_argument("--skip-entities", action="store_true", help="Leave the entities of the new titles to be "
+                                                                     "extracted by build_entities.py.")
+    args = parser.parse_args()
+    file_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "jsonl")
+    item_type, model, read_item = SOURCES[args.source]
+
+    with app.app_context():
+        init_db()
+        last_id = db.session.query(db.func.max(model.id)).scalar() or 0
+        records = read_records(args.path, file_format)
+        began = time.perf_counter()
+        read = inserted = rejected = uncommitted = 0
+        while True:
+            chunk = list(itertools.islice(records, args.chunk_size))
+            if not chunk:
+                break
+            items = [item for item in map(read_item, chunk) if item is not None]
+            rejected += len(chunk) - len(items)
+            inserted += import_chunk(model, items)
+            read += len(chunk)
+            uncommitted += len(chunk)
+            if uncommitted >= args.commit_every:
+                db.session.commit()
+                uncommitted = 0
+            print(f"Read {read} rows, inserted {inserted}, {read / (time.perf_counter() - began):.0f} rows/s")
+        db.session.commit()
+        elapsed = time.perf_counter() - began
+        print(f"Imported {inserted} {item_type}s from {read} rows in {elapsed:.1f}s ({read / max(elapsed, 1e-9):.0f} "
+              f"rows/s), skipping {read - inserted - rejected} already in the catalogue and {rejected} rejected")
+
+        if inserted:
+            max_id = db.session.query(db.func.max(model.id)).scalar()
+            rebuild_derived(item_type, model, last_id, max_id, args.batch_size, args.n_process, args.skip_entities)
+        print(f"Finished in {time.perf_counter() - began:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
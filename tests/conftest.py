@@ -0,0 +1,19 @@
+import os
+import shutil
+import sys
+import tempfile
+import pytest
+
+#Run the tests against a copy of the bundled database, as init_db creates any missing tables in it.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+_folder = tempfile.mkdtemp()
+shutil.copy(os.path.join(ROOT, 'app', 'data', 'data.sqlite'), _folder)
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_folder, 'data.sqlite')
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    from app import app, init_db
+    with app.app_context():
+        init_db()
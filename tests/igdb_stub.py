@@ -0,0 +1,90 @@
+"""
+A local stub of the Twitch token endpoint and the IGDB API, used by the IGDBClient tests and by
+benchmarks/bench_igdb_client.py.
+"""
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler
+
+#The year every game found by a search was released in.
+YEAR = 2020
+
+
+class StubIGDB(BaseHTTPRequestHandler):
+    """
+    Answers the token endpoint and the games, covers, involved_companies and companies endpoints of IGDB with made up
+    records. Every game found by a search was released in YEAR. Each token issued is new, and queries made with a token
+    in revoked are answered with a 401. The endpoint and body of every request are kept in log.
+    """
+    delay = 0.05
+    results = 5
+    expires_in = 3600
+    requests = 0
+    tokens = 0
+    revoked = set()
+    log = []
+    lock = threading.Lock()
+
+    @staticmethod
+    def reset():
+        """
+        Puts the stub back in its default state, with no delay and no requests made.
+        """
+        StubIGDB.delay = 0
+        StubIGDB.results = 5
+        StubIGDB.expires_in = 3600
+        StubIGDB.requests = 0
+        StubIGDB.tokens = 0
+        StubIGDB.revoked = set()
+        StubIGDB.log = []
+
+    def do_POST(self):
+        with StubIGDB.lock:
+            StubIGDB.requests += 1
+        time.sleep(self.delay)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+        endpoint = self.path.rstrip('/').split('/')[-1].split('?')[0]
+        StubIGDB.log.append((endpoint, body))
+        ids = [int(record_id) for record_id in re.findall(r"\d+", (re.findall(r"where id ?= ?\(([^)]*)\)", body)
+                                                                    or [""])[0])]
+        if endpoint == 'token':
+            with StubIGDB.lock:
+                StubIGDB.tokens += 1
+                token = f"stub-token-{StubIGDB.tokens}"
+            records = {'access_token': token, 'expires_in': self.expires_in, 'token_type': 'bearer'}
+        elif self.headers.get('Authorization', '').split(' ')[-1] in StubIGDB.revoked:
+            self.send_response(401)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        else:
+            records = self.records(endpoint, ids)
+        content = json.dumps(records).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def records(self, endpoint, ids):
+        """
+        Makes up the records returned by an IGDB endpoint.
+        :param endpoint: The name of the endpoint.
+        :param ids: The IDs in the "where id = (...)" clause of the query.
+        :return: The list of records.
+        """
+        if endpoint == 'games':
+            released = int(datetime(YEAR, 6, 1).timestamp())
+            return [{'id': i, 'name': f"Game {i}", 'first_release_date': released, 'cover': 1000 + i,
+                     'involved_companies': [2000 + i]} for i in range(1, self.results + 1)]
+        if endpoint == 'covers':
+            return [{'id': i, 'url': f"//images.igdb.com/{i}.jpg"} for i in ids]
+        if endpoint == 'involved_companies':
+            return [{'id': i, 'company': i + 1000} for i in ids]
+        return [{'id': i, 'name': f"Developer {i}"} for i in ids]
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,106 @@
+import threading
+from http.server import ThreadingHTTPServer
+import pytest
+import requests
+from app.igdb import IGDBClient
+from tests.igdb_stub import StubIGDB
+
+
+class PartialStubIGDB(StubIGDB):
+    """
+    Returns games which are missing a cover or a company, in one of the ways IGDB does.
+    """
+
+    def records(self, endpoint, ids):
+        if endpoint == 'games':
+            return [{'id': 1, 'cover': 1001, 'involved_companies': [2001]},
+                    {'id': 2, 'involved_companies': [2002]},
+                    {'id': 3, 'cover': 1003},
+                    {'id': 4, 'cover': 1004, 'involved_companies': []},
+                    {'id': 5, 'cover': 9999, 'involved_companies': [2005]},
+                    {'id': 6, 'cover': 1006, 'involved_companies': [9999]}]
+        if endpoint == 'covers':
+            return [{'id': i, 'url': f"//images.igdb.com/{i}.jpg"} for i in ids if i != 9999]
+        if endpoint == 'involved_companies':
+            return [{'id': i, 'company': i + 1000} for i in ids if i != 9999]
+        return super().records(endpoint, ids)
+
+
+@pytest.fixture(autouse=True)
+def reset_stub():
+    StubIGDB.reset()
+    yield
+    StubIGDB.reset()
+
+
+def serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    return server, IGDBClient("id", "s", f"{base}/v4", f"{base}/oauth2/token")
+
+
+@pytest.fixture
+def stub():
+    server, client = serve(StubIGDB)
+    yield client
+    server.shutdown()
+
+
+@pytest.fixture
+def partial_stub():
+    server, client = serve(PartialStubIGDB)
+    yield client
+    server.shutdown()
+
+
+def endpoints():
+    return [endpoint for endpoint, body in StubIGDB.log]
+
+
+def test_token_is_reused_until_it_expires(stub):
+    stub.search_games("Game")
+    stub.search_games("Game")
+    assert endpoints() == ['token', 'games', 'games']
+
+    #A token expiring within a minute is replaced.
+    stub.expires = 0
+    stub.search_games("Game")
+    assert endpoints() == ['token', 'games', 'games', 'token', 'games']
+    assert stub.access_token == "stub-token-2"
+
+
+def test_revoked_token_is_refreshed_and_retried_once(stub):
+    stub.search_games("Game")
+    StubIGDB.revoked.add(stub.access_token)
+    assert len(stub.search_games("Game")) == StubIGDB.results
+    assert endpoints() == ['token', 'games', 'games', 'token', 'games']
+
+
+def test_query_fails_after_one_retry(stub):
+    stub.token()
+    StubIGDB.revoked.update({"stub-token-1", "stub-token-2", "stub-token-3"})
+    with pytest.raises(requests.HTTPError):
+        stub.search_games("Game")
+    assert endpoints() == ['token', 'games', 'token', 'games']
+
+
+def test_find_all_batches_ids_into_one_request_per_endpoint(stub):
+    found = stub.find_all({'covers': ("covers", [1003, 1001, 1002, 1001]),
+                           'involved': ("involved_companies", [2001, 2002])})
+    assert set(found['covers']) == {1001, 1002, 1003}
+    assert set(found['involved']) == {2001, 2002}
+    assert sorted(endpoints()) == ['covers', 'involved_companies', 'token']
+    assert dict(StubIGDB.log)['covers'] == "fields *; where id = (1001,1002,1003); limit 3;"
+
+
+def test_game_details_makes_three_queries(stub):
+    games = stub.search_games("Game")
+    details = stub.game_details(games)
+    assert details == {i: (f"//images.igdb.com/{1000 + i}.jpg", f"Developer {3000 + i}") for i in range(1, 6)}
+    assert sorted(endpoints()) == ['companies', 'covers', 'games', 'involved_companies', 'token']
+
+
+def test_game_details_skips_missing_covers_and_companies(partial_stub):
+    details = partial_stub.game_details(partial_stub.search_games("Game"))
+    assert details == {1: ("//images.igdb.com/1001.jpg", "Developer 3001")}
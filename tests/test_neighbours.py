@@ -0,0 +1,73 @@
+import sys
+import pytest
+import build_neighbours
+from app import app, db
+from app.models import *
+from app.neighbours import stored_neighbours
+from app.recommender import calculate_recommender
+from app.recommender_index import get_index, read_index, log_tag_change, log_item_change
+
+K = 5
+
+
+@pytest.fixture
+def built(monkeypatch):
+    with app.app_context():
+        monkeypatch.setattr(sys, 'argv', ['build_neighbours.py', '-k', str(K)])
+        build_neighbours.main()
+        tagged = ItemTags.query.order_by(ItemTags.item_type, ItemTags.item_id).first()
+        yield (tagged.item_id, tagged.item_type)
+        db.session.rollback()
+
+
+def expected(key, weighting=0, top_n=K):
+    return list(calculate_recommender(key[0], key[1], weighting, top_n, False).items())
+
+
+def stored(key, weighting=0, top_n=K):
+    with read_index() as index:
+        return stored_neighbours(index, key[0], key[1], weighting, top_n)
+
+
+def change_tags(key, amount):
+    item_tag = ItemTags.query.filter_by(item_id=key[0], item_type=key[1]).first()
+    if item_tag is None:
+        tag = Tags.query.first()
+        item_tag = ItemTags(item_id=key[0], item_type=key[1], tag_id=tag.tag_id, count=0)
+        db.session.add(item_tag)
+    item_tag.count += amount
+    log_tag_change(key[0], key[1], item_tag.tag_id, item_tag.count)
+    db.session.commit()
+
+
+def test_unchanged_neighbours_match_calculate_recommender(built):
+    assert stored(built) == expected(built)
+    assert stored(built, 0.3, 2) == expected(built, 0.3, 2)
+
+
+def test_changed_neighbour_is_scored_live(built):
+    neighbour = stored(built)[0][0]
+    change_tags(neighbour, 50)
+    assert stored(built) is None
+
+
+def test_changed_item_is_scored_live(built):
+    change_tags(built, 50)
+    assert stored(built) is None
+
+
+def test_changed_other_item_matches_calculate_recommender(built):
+    neighbours = {neighbour for neighbour, score in stored(built)}
+    other = next(key for key in get_index().keys if key not in neighbours and tuple(key) != built)
+    change_tags(other, 50)
+    result = stored(built)
+    assert result is None or result == expected(built)
+
+
+def test_added_item_is_scored_live(built):
+    game = Games(title="A new game for the neighbours test", developer="Test", year="2024")
+    db.session.add(game)
+    db.session.flush()
+    log_item_change(game.id, "game", game.title)
+    db.session.commit()
+    assert stored(built) is None
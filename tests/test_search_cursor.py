@@ -0,0 +1,67 @@
+import base64
+import pytest
+from sqlalchemy import text
+import app.search_index as search_index
+from app import app, db
+from app.get_info import SEARCH_TYPES, decode_cursor, encode_cursor, search_page, search_query
+
+
+def cursor_of(text):
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(1, [0, 12])) == (1, [0, 12])
+    assert decode_cursor(encode_cursor(0, None)) == (0, None)
+
+
+@pytest.mark.parametrize("cursor", ["zzz", cursor_of("5"), cursor_of("null"), cursor_of("[1]"), cursor_of("[9, null]"),
+                                    cursor_of('[0, "key"]')])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("cursor", ["zzz", "NQ==", "bnVsbA=="])
+def test_invalid_cursor_returns_400(cursor):
+    response = app.test_client().get('/search_results', query_string={'query': 'a', 'cursor': cursor})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("full_text", [True, False])
+def test_page_filled_by_the_last_book_has_no_next_page(full_text):
+    #Only books match "classic", so a page holding every book is the last page.
+    with app.app_context():
+        matches = [search_query("classic", *search_type, full_text)[0].count() for search_type in SEARCH_TYPES]
+        assert matches[0] > 0 and matches[1:] == [0, 0]
+        results, cursor = search_page("classic", matches[0], full_text=full_text)
+        assert len(results) == matches[0]
+        assert cursor is None
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 3, 4, 7])
+def test_pages_are_never_empty(page_size):
+    with app.app_context():
+        seen = []
+        results, cursor = search_page("harry", page_size)
+        seen += results
+        while cursor is not None:
+            results, cursor = search_page("harry", page_size, cursor)
+            assert results
+            seen += results
+        assert len(seen) == sum(search_query("harry", *search_type)[0].count() for search_type in SEARCH_TYPES)
+
+
+def test_search_falls_back_to_scanning_without_the_index(monkeypatch):
+    with app.app_context():
+        expected, cursor = search_page("harry", 100, full_text=False)
+        db.session.execute(text("ALTER TABLE search_index RENAME TO search_index_moved"))
+        db.session.commit()
+        monkeypatch.setattr(search_index, '_search_index_exists', False)
+        try:
+            results, cursor = search_page("harry", 100)
+        finally:
+            db.session.execute(text("ALTER TABLE search_index_moved RENAME TO search_index"))
+            db.session.commit()
+        assert [(item_type, item.id) for item_type, item, tags in results] == \
+               [(item_type, item.id) for item_type, item, tags in expected]